@@ -1,16 +1,16 @@
-from fastapi import FastAPI, HTTPException, File, UploadFile, WebSocket, WebSocketDisconnect, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, File, UploadFile, WebSocket, WebSocketDisconnect, Depends, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any, Set, Union
 import asyncio
-import uuid
+import secrets
 import os
 import json
+import orjson
 import time
+import math
 import logging
-import tempfile
-import shutil
 from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
@@ -34,13 +34,15 @@ logging.getLogger("uvicorn.error").propagate = False
 from app.nodes.chat_input_node import chat_input_node
 from app.nodes.intent_parser_node import intent_parser_node
 from app.nodes.trip_validator_node import trip_validator_node, process_user_response
-from app.nodes.planner_node import planner_node
-from app.nodes.agent_nodes import (
-    flights_node, places_node, restaurants_node, hotel_node,
-    budget_node, reviews_node, route_node
-)
+from app.nodes.planner_node import agent_selector_node as planner_node
+from app.nodes.agents.reviews_node import reviews_node
+from app.nodes.agent_runner import NODE_REGISTRY, run_node, run_agent_nodes
 from app.nodes.summary_node import summary_node
 from app.schemas.trip_schema import TripData
+from app import state_store
+from app.connection_manager import ConnectionManager
+from app.utils.http_client import close_http_clients
+from app.utils.uploads import MAX_AUDIO_BYTES, UPLOAD_CHUNK_SIZE, save_upload, save_upload_to_temp
 
 # Import services
 from endpoints.services.speech_to_text import transcribe_audio
@@ -52,6 +54,7 @@ app = FastAPI(
     version="2.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS
@@ -63,14 +66,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("shutdown")
+async def close_shared_clients():
+    """Release pooled outbound HTTP connections."""
+    await close_http_clients()
+
 # Create dedicated directories
 AUDIO_DIR = Path("audio_files")
 AUDIO_DIR.mkdir(exist_ok=True)
 
-# In-memory storage
-conversation_states: Dict[str, Dict[str, Any]] = {}
-active_connections: Dict[str, Set[WebSocket]] = {}
-active_jobs: Dict[str, Dict[str, Any]] = {}
+# Request bodies are rejected outright above this size; the slack covers
+# multipart framing around an audio upload
+MAX_REQUEST_BYTES = MAX_AUDIO_BYTES + UPLOAD_CHUNK_SIZE
+
+@app.middleware("http")
+async def limit_request_size(request: Request, call_next):
+    """Reject requests that declare a body larger than MAX_REQUEST_BYTES."""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_REQUEST_BYTES:
+        return ORJSONResponse(status_code=413, content={"detail": "Request body too large"})
+    return await call_next(request)
+
+# Conversation states and jobs live in app.state_store so they can be shared
+# between workers; WebSocket connections are held per worker by the connection
+# manager, which relays broadcasts between workers over Redis pub/sub.
+connection_manager = ConnectionManager(state_store.get_redis_client())
+
+# Updates waiting to be broadcast, and the tasks flushing them
+BROADCAST_BATCH_WINDOW = 0.05
+pending_broadcasts: Dict[str, List[Dict[str, Any]]] = {}
+broadcast_tasks: Set[asyncio.Task] = set()
 
 #-------------------------------------------------------
 # Models
@@ -140,22 +165,55 @@ class JobStatusResponse(BaseModel):
     message: str
     result_id: Optional[str] = None  # ID to fetch results when complete
     error: Optional[str] = None
+    next_poll_in_ms: Optional[int] = None  # Suggested delay before polling again
 
 #-------------------------------------------------------
 # Helper Functions
 #-------------------------------------------------------
 
+# Shown when validation fails and the validator offered no suggestions
+DEFAULT_VALIDATION_SUGGESTIONS = (
+    "Try specifying dates in MM/DD/YYYY format",
+    "Make sure to include your destination",
+    "Specify the number of travelers",
+)
+
+# Poll hints start at 500ms and double as a job or connection ages, up to 5 minutes
+MIN_POLL_INTERVAL_MS = 500
+MAX_POLL_INTERVAL_MS = 300_000
+
+def poll_backoff_ms(age_seconds: float) -> int:
+    """Suggested delay before the next poll for something age_seconds old"""
+    age_bucket = int(math.log2(1 + max(age_seconds, 0.0)))
+    return min(MAX_POLL_INTERVAL_MS, MIN_POLL_INTERVAL_MS * 2 ** min(age_bucket, 9))
+
+# ISO timestamp reused for up to a second by now_iso()
+_now_iso_cache = {"second": None, "value": ""}
+
+def now_iso() -> str:
+    """Current time in ISO format, formatted at most once per second"""
+    second = int(time.time())
+    if _now_iso_cache["second"] != second:
+        _now_iso_cache["second"] = second
+        _now_iso_cache["value"] = datetime.fromtimestamp(second).isoformat()
+    return _now_iso_cache["value"]
+
 def generate_id() -> str:
     """Generate a unique ID for requests and jobs"""
-    return str(uuid.uuid4())
+    return secrets.token_hex(16)
 
 async def process_nodes(state, nodes_to_call, skip_flight_selection=False):
-    """Process the required nodes in sequence"""
+    """Process the required nodes, running independent agents concurrently"""
     try:
+        # Reject unknown node names before any agent runs
+        unknown_nodes = [n for n in nodes_to_call if n not in NODE_REGISTRY]
+        if unknown_nodes:
+            raise KeyError(f"Unknown nodes requested: {', '.join(unknown_nodes)}")
+        
         # Process flight node separately if needed
         if 'flights' in nodes_to_call and not skip_flight_selection:
             logger.info("Processing flights_node")
-            state = await flights_node(state)
+            state = await run_node(NODE_REGISTRY["flights"], state)
             
             # Mark state as awaiting flight selection
             if state.get("flights"):
@@ -165,28 +223,16 @@ async def process_nodes(state, nodes_to_call, skip_flight_selection=False):
         # Process other nodes
         remaining_nodes = [n for n in nodes_to_call if n != "flights" or skip_flight_selection]
         
-        for node in remaining_nodes:
-            logger.info(f"Processing node: {node}")
-            if node == "route":
-                state = await route_node(state)
-            elif node == "places":
-                state = await places_node(state)
-            elif node == "restaurants":
-                state = await restaurants_node(state)
-            elif node == "hotel":
-                state = await hotel_node(state)
-            elif node == "budget":
-                state = await budget_node(state)
-            elif node == "flights" and skip_flight_selection:
-                # Only if we're skipping selection and need to process flights
-                state = await flights_node(state)
+        # Agents that only read trip metadata run together, then the
+        # agents that build on their output
+        state = await run_agent_nodes(state, remaining_nodes)
         
         # Process review and summary nodes
         logger.info("Processing reviews_node")
-        state = await reviews_node(state)
+        state = await run_node(reviews_node, state)
         
         logger.info("Processing summary_node")
-        state = await summary_node(state)
+        state = await run_node(summary_node, state)
         
         # Mark planning as complete
         state["planning_complete"] = True
@@ -195,9 +241,7 @@ async def process_nodes(state, nodes_to_call, skip_flight_selection=False):
         return state
     
     except Exception as e:
-        logger.error(f"Error in process_nodes: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error in process_nodes: {str(e)}")
         state["error"] = str(e)
         return state
 
@@ -206,100 +250,145 @@ async def create_travel_response(state, conversation_id, request_id=None, messag
     
     if request_id is None:
         request_id = generate_id()
-        
+    
+    # Read everything the response needs from state once
+    error = state.get("error")
+    is_valid = state.get("is_valid")
+    awaiting_flight_selection = state.get("awaiting_flight_selection")
+    selected_flights = state.get("selected_flights")
+    itinerary = state.get("itinerary")
+    trip_summary = state.get("trip_summary")
+    daily_itinerary = state.get("daily_itinerary")
+    next_question = state.get("next_question") if state.get("interactive_mode") else None
+    
     if message is None:
-        if state.get("error"):
-            message = f"Error: {state['error']}"
-        elif state.get("awaiting_flight_selection"):
+        if error:
+            message = f"Error: {error}"
+        elif awaiting_flight_selection:
             message = "Please select your preferred flight"
-        elif state.get("itinerary"):
+        elif itinerary:
             message = "Your travel itinerary is ready"
-        elif state.get("is_valid") is False:
+        elif is_valid is False:
             message = "We need more information for your trip"
         else:
             message = "Processing your travel request"
     
-    response = TravelResponse(
-        request_id=request_id,
-        conversation_id=conversation_id,
-        message=message,
-        status="success" if not state.get("error") else "error",
-        is_valid=state.get("is_valid"),
-        error=state.get("error")
-    )
+    # Later stages take precedence for the next interaction
+    if state.get("planning_complete"):
+        next_interaction = "complete"
+    elif awaiting_flight_selection:
+        next_interaction = "flight_selection"
+    elif is_valid is False:
+        next_interaction = "validation"
+    else:
+        next_interaction = None
     
-    # Set validation errors and questions if validation failed
-    if state.get("is_valid") is False:
-        response.validation_errors = state.get("validation_errors")
-        response.next_interaction = "validation"
-        response.suggestions = state.get("suggestions", [
-            "Try specifying dates in MM/DD/YYYY format",
-            "Make sure to include your destination",
-            "Specify the number of travelers"
-        ])
-        
-        if state.get("interactive_mode") and state.get("next_question"):
-            response.next_question = state.get("next_question")
+    fields = {
+        "request_id": request_id,
+        "conversation_id": conversation_id,
+        "message": message,
+        "status": "error" if error else "success",
+        "is_valid": is_valid,
+        "error": error,
+        "next_interaction": next_interaction,
+        "in_progress": bool(awaiting_flight_selection or next_question),
+    }
     
-    # Flight selection
-    if state.get("awaiting_flight_selection"):
-        response.flight_options = state.get("flights")
-        response.next_interaction = "flight_selection"
+    # Validation errors, suggestions and follow-up question if validation failed
+    if is_valid is False:
+        fields["validation_errors"] = state.get("validation_errors")
+        suggestions = state.get("suggestions")
+        fields["suggestions"] = list(DEFAULT_VALIDATION_SUGGESTIONS) if suggestions is None else suggestions
+        fields["next_question"] = next_question
     
-    # Selected flight
-    if state.get("selected_flights") and len(state.get("selected_flights", [])) > 0:
-        response.selected_flight = state.get("selected_flights")[0]
+    if awaiting_flight_selection:
+        fields["flight_options"] = state.get("flights")
+    if selected_flights:
+        fields["selected_flight"] = selected_flights[0]
+    if itinerary:
+        fields["itinerary"] = itinerary if isinstance(itinerary, dict) else {"full_text": itinerary}
+    if trip_summary:
+        fields["trip_summary"] = trip_summary
+    if daily_itinerary:
+        fields["daily_plan"] = daily_itinerary
     
-    # Itinerary data
-    if state.get("itinerary"):
-        if isinstance(state["itinerary"], dict):
-            response.itinerary = state["itinerary"]
-        else:
-            response.itinerary = {"full_text": state["itinerary"]}
-            
-    if state.get("trip_summary"):
-        response.trip_summary = state["trip_summary"]
-        
-    if state.get("daily_itinerary"):
-        response.daily_plan = state["daily_itinerary"]
+    # Everything here comes from our own pipeline state, so skip validation
+    return TravelResponse.model_construct(**fields)
+
+def conversation_summary(conversation_id: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    """Summarize a conversation's progress for status checks and WebSocket clients"""
+    return {
+        "conversation_id": conversation_id,
+        "has_query": "query" in state,
+        "is_valid": state.get("is_valid", False),
+        "has_itinerary": "itinerary" in state,
+        "awaiting_flight_selection": state.get("awaiting_flight_selection", False),
+        "planning_complete": state.get("planning_complete", False),
+        "has_error": "error" in state,
+        "version": state.get("_version", 0)
+    }
+
+def cached_summary(conversation_id: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the summary stored with the state, building it if missing"""
+    return state.get("_summary") or conversation_summary(conversation_id, state)
+
+def state_update_frame(conversation_id: str, state: Dict[str, Any]) -> str:
+    """Serialize the WebSocket state_update message for a state"""
+    return orjson.dumps({"type": "state_update", "data": cached_summary(conversation_id, state)}).decode()
+
+def cached_state_update_frame(conversation_id: str, state: Dict[str, Any]) -> str:
+    """Return the state_update frame stored with the state, building it if missing"""
+    return state.get("_summary_frame") or state_update_frame(conversation_id, state)
+
+async def save_conversation_state(conversation_id: str, state: Dict[str, Any]):
+    """
+    Persist a conversation's state and notify its WebSocket subscribers.
     
-    # Set final status if planning is complete
-    if state.get("planning_complete"):
-        response.next_interaction = "complete"
+    Every write bumps state["_version"] and stores the summary, and its
+    serialized WebSocket frame, alongside the state, so readers don't
+    rebuild them until the state changes again.
+    """
+    state["_version"] = state.get("_version", 0) + 1
+    state["_summary"] = conversation_summary(conversation_id, state)
+    state["_summary_frame"] = state_update_frame(conversation_id, state)
+    await state_store.save_conversation(conversation_id, state)
+    await broadcast_update(conversation_id, "state_update", dict(state["_summary"]))
+
+async def broadcast_update(conversation_id: str, update_type: str, data: Dict[str, Any]):
+    """
+    Queue an update for all WebSocket connections for a conversation.
+    
+    Updates raised within BROADCAST_BATCH_WINDOW of each other are sent as
+    one frame: a single update goes out unchanged, several go out as
+    {"type": "batch", "events": [...]}.
+    """
+    # With Redis the subscribers may be connected to another worker
+    if state_store.get_redis_client() is None and not connection_manager.has_connections(conversation_id):
+        return
     
-    # In-progress status
-    response.in_progress = bool(state.get("awaiting_flight_selection") or 
-                               (state.get("interactive_mode") and state.get("next_question")))
+    if "conversation_id" not in data:
+        data["conversation_id"] = conversation_id
     
-    return response
+    pending = pending_broadcasts.get(conversation_id)
+    if pending is None:
+        pending = pending_broadcasts[conversation_id] = []
+        task = asyncio.create_task(_flush_broadcasts(conversation_id))
+        broadcast_tasks.add(task)
+        task.add_done_callback(broadcast_tasks.discard)
+    pending.append({"type": update_type, "data": data})
 
-async def broadcast_update(conversation_id: str, update_type: str, data: Dict[str, Any]):
-    """Send an update to all WebSocket connections for a conversation"""
-    if conversation_id in active_connections:
-        if "conversation_id" not in data:
-            data["conversation_id"] = conversation_id
-            
-        message = {"type": update_type, "data": data}
-        connections = list(active_connections[conversation_id])
-        
-        # Send to all connections
-        results = await asyncio.gather(
-            *[conn.send_json(message) for conn in connections],
-            return_exceptions=True
-        )
-        
-        # Handle dead connections
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                try:
-                    await connections[i].close()
-                except:
-                    pass
-                active_connections[conversation_id].discard(connections[i])
-        
-        # Clean up empty sets
-        if not active_connections[conversation_id]:
-            del active_connections[conversation_id]
+async def _flush_broadcasts(conversation_id: str):
+    """Send queued updates for a conversation until none are left"""
+    pending = pending_broadcasts[conversation_id]
+    try:
+        while pending:
+            await asyncio.sleep(BROADCAST_BATCH_WINDOW)
+            events = pending[:]
+            pending.clear()
+            message = events[0] if len(events) == 1 else {"type": "batch", "events": events}
+            await connection_manager.publish(conversation_id, orjson.dumps(message).decode())
+    finally:
+        del pending_broadcasts[conversation_id]
 
 async def background_process_task(
     job_id: str,
@@ -307,7 +396,8 @@ async def background_process_task(
     conversation_id: str,
     state: Dict[str, Any] = None,
     interactive: bool = True,
-    step_by_step: bool = False
+    step_by_step: bool = False,
+    cache_result: bool = False
 ):
     """Background task for processing travel queries"""
     if state is None:
@@ -315,75 +405,103 @@ async def background_process_task(
     
     try:
         # Update job status
-        active_jobs[job_id] = {
-            "status": "processing",
-            "progress": 0.1,
-            "message": "Processing your travel query",
-            "conversation_id": conversation_id
-        }
+        await state_store.update_job(
+            job_id,
+            status="processing",
+            progress=0.1,
+            message="Processing your travel query",
+            conversation_id=conversation_id,
+            started_at=time.time()
+        )
         
-        # Process through the pipeline nodes
+        # Process through the pipeline nodes. Jobs started from /travel/continue,
+        # /travel/select-flight and /travel/feedback reuse a state that has
+        # already been parsed and validated, so each stage records a *_done
+        # flag and is skipped once it has succeeded.
         # Step 1: Chat Input Node
-        state = await chat_input_node(state)
-        active_jobs[job_id]["progress"] = 0.2
+        if not state.get("chat_input_done"):
+            state = await chat_input_node(state)
+            state["chat_input_done"] = True
+        await state_store.update_job(job_id, progress=0.2)
         
         # Step 2: Intent Parser Node
-        state = await intent_parser_node(state)
-        active_jobs[job_id]["progress"] = 0.3
-        
-        # Check intent parsing errors
-        if state.get("error"):
-            active_jobs[job_id]["status"] = "failed"
-            active_jobs[job_id]["error"] = state["error"]
-            conversation_states[conversation_id] = state
-            return
-        
-        # Check if metadata was extracted
-        if not state.get("metadata"):
-            state["error"] = "Could not extract travel details from your query"
-            state["is_valid"] = False
-            active_jobs[job_id]["status"] = "failed"
-            active_jobs[job_id]["error"] = state["error"]
-            conversation_states[conversation_id] = state
-            return
+        if not state.get("intent_parser_done"):
+            state = await intent_parser_node(state)
+            
+            # Check intent parsing errors
+            if state.get("error"):
+                await state_store.update_job(job_id, status="failed", error=state["error"])
+                await save_conversation_state(conversation_id, state)
+                return
+            
+            # Check if metadata was extracted
+            if not state.get("metadata"):
+                state["error"] = "Could not extract travel details from your query"
+                state["is_valid"] = False
+                await state_store.update_job(job_id, status="failed", error=state["error"])
+                await save_conversation_state(conversation_id, state)
+                return
+            
+            state["intent_parser_done"] = True
+        await state_store.update_job(job_id, progress=0.3)
         
         # Step 3: Trip Validator Node
-        state = await trip_validator_node(state)
-        active_jobs[job_id]["progress"] = 0.4
-        
-        if not state.get("is_valid", False):
-            # Save for interactive follow-up if needed
-            conversation_states[conversation_id] = state
-            active_jobs[job_id]["status"] = "complete"
-            active_jobs[job_id]["result_id"] = conversation_id
-            return
+        if not state.get("trip_validator_done"):
+            state = await trip_validator_node(state)
+            
+            if not state.get("is_valid", False):
+                # Save for interactive follow-up if needed
+                await save_conversation_state(conversation_id, state)
+                await state_store.update_job(job_id, status="complete", result_id=conversation_id)
+                return
+            
+            state["trip_validator_done"] = True
+        await state_store.update_job(job_id, progress=0.4)
         
         # Step 4: Planner Node
-        state = await planner_node(state)
-        active_jobs[job_id]["progress"] = 0.5
+        if not state.get("planner_done"):
+            state = await planner_node(state)
+            if not state.get("error"):
+                state["planner_done"] = True
+        await state_store.update_job(job_id, progress=0.5)
         
         # Step 5: Agent Nodes
         state["step_by_step"] = step_by_step
         nodes_to_call = state.get('nodes_to_call', [])
         
+        # Flights were already fetched and one was chosen
+        if state.get("selected_flights"):
+            nodes_to_call = [n for n in nodes_to_call if n != "flights"]
+        
         # Process nodes with or without flight selection based on step_by_step flag
-        if step_by_step:
+        if state.get("planning_complete"):
+            # Nothing is stale: feedback re-runs only the agents it affects
+            # and the summary before this job starts
+            logger.info(f"Planning already complete for conversation: {conversation_id}")
+        elif step_by_step:
             # Process up to flight selection if flights are in nodes_to_call
             state = await process_nodes(state, nodes_to_call, skip_flight_selection=False)
-            active_jobs[job_id]["progress"] = 0.8
+            await state_store.update_job(job_id, progress=0.8)
         else:
             # Skip flight selection in non-interactive mode, autogenerate itinerary
             state = await process_nodes(state, nodes_to_call, skip_flight_selection=True)
-            active_jobs[job_id]["progress"] = 0.9
+            await state_store.update_job(job_id, progress=0.9)
             
         # Save the state
-        conversation_states[conversation_id] = state
+        await save_conversation_state(conversation_id, state)
+        
+        # Reuse finished plans for identical queries
+        if cache_result and state.get("planning_complete") and not state.get("error"):
+            await state_store.cache_plan(query, state)
         
         # Mark job as complete
-        active_jobs[job_id]["status"] = "complete"
-        active_jobs[job_id]["progress"] = 1.0
-        active_jobs[job_id]["message"] = "Processing complete"
-        active_jobs[job_id]["result_id"] = conversation_id
+        await state_store.update_job(
+            job_id,
+            status="complete",
+            progress=1.0,
+            message="Processing complete",
+            result_id=conversation_id
+        )
         
         # Send WebSocket update if sockets exist
         update_data = {
@@ -396,19 +514,15 @@ async def background_process_task(
         await broadcast_update(conversation_id, "job_update", update_data)
         
     except Exception as e:
-        logger.error(f"Error in background_process_task: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error in background_process_task: {str(e)}")
         
         # Update job status on error
-        active_jobs[job_id]["status"] = "failed"
-        active_jobs[job_id]["error"] = str(e)
-        active_jobs[job_id]["progress"] = 1.0
+        await state_store.update_job(job_id, status="failed", error=str(e), progress=1.0)
         
         # Save error state
-        if conversation_id not in conversation_states:
-            conversation_states[conversation_id] = {}
-        conversation_states[conversation_id]["error"] = str(e)
+        error_state = await state_store.get_conversation(conversation_id) or {}
+        error_state["error"] = str(e)
+        await save_conversation_state(conversation_id, error_state)
         
         # Send error update via WebSocket
         await broadcast_update(
@@ -449,16 +563,29 @@ async def create_travel_plan(
     try:
         # Generate IDs
         request_id = generate_id()
-        job_id = generate_id()
         
         # If no conversation_id provided, create one
         conversation_id = request.conversation_id or generate_id()
         
+        # Serve identical queries from the response cache. Step-by-step
+        # requests still go through flight selection.
+        if not request.step_by_step:
+            cached_state = await state_store.get_cached_plan(request.query)
+            if cached_state is not None:
+                logger.info(f"Serving cached travel plan for conversation: {conversation_id}")
+                await save_conversation_state(conversation_id, cached_state)
+                return await create_travel_response(
+                    state=cached_state,
+                    conversation_id=conversation_id,
+                    request_id=request_id
+                )
+        
         # Initialize state with query
+        job_id = generate_id()
         state = {"query": request.query}
         
         # Add to conversation states (will be updated by background task)
-        conversation_states[conversation_id] = state
+        await save_conversation_state(conversation_id, state)
         
         # Start background processing
         background_tasks.add_task(
@@ -468,7 +595,8 @@ async def create_travel_plan(
             conversation_id=conversation_id,
             state=state,
             interactive=request.interactive,
-            step_by_step=request.step_by_step
+            step_by_step=request.step_by_step,
+            cache_result=not request.step_by_step
         )
         
         # Return initial response with job_id
@@ -484,9 +612,7 @@ async def create_travel_plan(
         return response
         
     except Exception as e:
-        logger.error(f"Error in create_travel_plan: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error in create_travel_plan: {str(e)}")
         
         return TravelResponse(
             request_id=generate_id(),
@@ -506,18 +632,24 @@ async def get_job_status(job_id: str):
     Once the job is marked as complete, you can fetch the results using
     the `/travel/results/{conversation_id}` endpoint with the `result_id`.
     """
-    if job_id not in active_jobs:
+    job = await state_store.get_job(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = active_jobs[job_id]
+    # Finished jobs need no further polling
+    status = job.get("status", "pending")
+    next_poll_in_ms = None
+    if status not in ("complete", "failed"):
+        next_poll_in_ms = poll_backoff_ms(time.time() - job.get("started_at", time.time()))
     
     return JobStatusResponse(
         job_id=job_id,
-        status=job.get("status", "pending"),
+        status=status,
         progress=job.get("progress", 0.0),
         message=job.get("message", "Job is being processed"),
         result_id=job.get("result_id"),
-        error=job.get("error")
+        error=job.get("error"),
+        next_poll_in_ms=next_poll_in_ms
     )
 
 @app.get("/travel/results/{conversation_id}", response_model=TravelResponse)
@@ -529,11 +661,10 @@ async def get_travel_results(conversation_id: str):
     travel plan, including itinerary, flight options, and any interactive
     steps needed to complete the planning process.
     """
-    if conversation_id not in conversation_states:
+    state = await state_store.get_conversation(conversation_id)
+    if state is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    state = conversation_states[conversation_id]
-    
     return await create_travel_response(
         state=state,
         conversation_id=conversation_id,
@@ -561,11 +692,10 @@ async def select_flight(
         conversation_id = request.conversation_id
         
         # Check if conversation exists
-        if conversation_id not in conversation_states:
+        state = await state_store.get_conversation(conversation_id)
+        if state is None:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
-        state = conversation_states[conversation_id]
-        
         # Check if we're awaiting flight selection
         if not state.get("awaiting_flight_selection"):
             raise HTTPException(status_code=400, detail="Not awaiting flight selection")
@@ -589,7 +719,7 @@ async def select_flight(
         state["awaiting_flight_selection"] = False
         
         # Save updated state
-        conversation_states[conversation_id] = state
+        await save_conversation_state(conversation_id, state)
         
         # If step-by-step mode, just return confirmation
         if request.step_by_step:
@@ -631,9 +761,7 @@ async def select_flight(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in select_flight: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error in select_flight: {str(e)}")
         
         return TravelResponse(
             request_id=generate_id(),
@@ -655,11 +783,10 @@ async def continue_planning(request: FlightSelection, background_tasks: Backgrou
         conversation_id = request.conversation_id
         
         # Check if conversation exists
-        if conversation_id not in conversation_states:
+        state = await state_store.get_conversation(conversation_id)
+        if state is None:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
-        state = conversation_states[conversation_id]
-        
         # Check if we have selected flights
         if not state.get("selected_flights"):
             raise HTTPException(status_code=400, detail="No flight has been selected")
@@ -693,9 +820,7 @@ async def continue_planning(request: FlightSelection, background_tasks: Backgrou
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in continue_planning: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error in continue_planning: {str(e)}")
         
         return TravelResponse(
             request_id=generate_id(),
@@ -718,11 +843,10 @@ async def provide_feedback(request: FeedbackRequest, background_tasks: Backgroun
         conversation_id = request.conversation_id
         
         # Check if conversation exists
-        if conversation_id not in conversation_states:
+        state = await state_store.get_conversation(conversation_id)
+        if state is None:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
-        state = conversation_states[conversation_id]
-        
         # Check if we have an itinerary
         if not state.get("itinerary"):
             raise HTTPException(status_code=400, detail="No itinerary available to modify")
@@ -737,6 +861,7 @@ async def provide_feedback(request: FeedbackRequest, background_tasks: Backgroun
         # This would typically update the state with feedback and mark nodes for reprocessing
         from app.pipeline import process_feedback
         state = await process_feedback(state, feedback)
+        await save_conversation_state(conversation_id, state)
         
         # Start background processing to update the itinerary
         job_id = generate_id()
@@ -764,9 +889,7 @@ async def provide_feedback(request: FeedbackRequest, background_tasks: Backgroun
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in provide_feedback: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error in provide_feedback: {str(e)}")
         
         return TravelResponse(
             request_id=generate_id(),
@@ -802,21 +925,21 @@ async def process_voice_input(
         
         # Save the audio file
         filename = file.filename
-        original_ext = os.path.splitext(filename)[1] or ".mp3"
-        
-        # Use temporary file for initial save
-        with tempfile.NamedTemporaryFile(delete=False, suffix=original_ext) as temp:
-            shutil.copyfileobj(file.file, temp)
-            temp_path = temp.name
+        original_ext = Path(filename or "").suffix or ".mp3"
         
-        # If keep_debug_files is True, also save to persistent location
+        # Write the upload once: straight to the persistent location when
+        # keep_debug_files is True, otherwise to a temporary file
         if options.keep_debug_files:
             timestamp = int(time.time())
             audio_path = AUDIO_DIR / f"recording_{timestamp}{original_ext}"
-            shutil.copy2(temp_path, audio_path)
+            temp_path = str(audio_path)
+            with open(audio_path, "wb") as dest:
+                await save_upload(file, dest)
+        else:
+            temp_path = await save_upload_to_temp(file, original_ext)
         
         # Transcribe the audio
-        transcript = transcribe_audio(temp_path, keep_files=options.keep_debug_files)
+        transcript = await asyncio.to_thread(transcribe_audio, temp_path, keep_files=options.keep_debug_files)
         
         if not transcript:
             return TravelResponse(
@@ -831,7 +954,7 @@ async def process_voice_input(
         state = {"query": transcript}
         
         # Add to conversation states (will be updated by background task)
-        conversation_states[conversation_id] = state
+        await save_conversation_state(conversation_id, state)
         
         # Start background processing
         background_tasks.add_task(
@@ -853,11 +976,15 @@ async def process_voice_input(
             in_progress=True,
             job_id=job_id
         )
+    
+    except HTTPException:
+        # Drop the partial upload, even when debug files are kept
+        if temp_path:
+            Path(temp_path).unlink(missing_ok=True)
+        raise
         
     except Exception as e:
-        logger.error(f"Error in process_voice_input: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error in process_voice_input: {str(e)}")
         
         return TravelResponse(
             request_id=generate_id(),
@@ -868,115 +995,97 @@ async def process_voice_input(
         )
     finally:
         # Clean up the temporary file
-        if temp_path and os.path.exists(temp_path) and not options.keep_debug_files:
+        if temp_path and not options.keep_debug_files:
             try:
-                os.remove(temp_path)
-            except:
-                pass
+                Path(temp_path).unlink(missing_ok=True)
+            except OSError as e:
+                logger.debug(f"Could not remove temporary audio file {temp_path}: {e}")
 
 @app.get("/travel/conversations")
 async def list_conversations():
     """List all active conversation IDs."""
+    conversation_ids = await state_store.list_conversations()
     return {
-        "conversations": list(conversation_states.keys()),
-        "count": len(conversation_states)
+        "conversations": conversation_ids,
+        "count": len(conversation_ids)
     }
 
 @app.get("/travel/conversation/{conversation_id}")
 async def get_conversation(conversation_id: str):
     """Get details of a specific conversation."""
-    if conversation_id not in conversation_states:
+    state = await state_store.get_conversation(conversation_id)
+    if state is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    state = conversation_states[conversation_id]
-    
     # Return a summary of the conversation state
     return {
-        "conversation_id": conversation_id,
-        "has_query": "query" in state,
-        "is_valid": state.get("is_valid", False),
-        "has_itinerary": "itinerary" in state,
-        "awaiting_flight_selection": state.get("awaiting_flight_selection", False),
-        "planning_complete": state.get("planning_complete", False),
-        "has_error": "error" in state,
+        **cached_summary(conversation_id, state),
         "metadata": state.get("metadata"),
-        "updated_at": datetime.now().isoformat()
+        "updated_at": now_iso()
     }
 
 @app.delete("/travel/conversation/{conversation_id}")
 async def delete_conversation(conversation_id: str):
     """Delete a conversation state."""
-    if conversation_id not in conversation_states:
+    if await state_store.get_conversation(conversation_id) is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    del conversation_states[conversation_id]
+    await state_store.delete_conversation(conversation_id)
     
-    # Also remove from WebSocket connections if present
-    if conversation_id in active_connections:
-        # Close all connections
-        for connection in active_connections[conversation_id]:
-            try:
-                await connection.close()
-            except:
-                pass
-        del active_connections[conversation_id]
+    # Also close the conversation's WebSocket connections, on every worker
+    await connection_manager.close_everywhere(conversation_id)
     
     return {"message": f"Conversation {conversation_id} deleted"}
 
+# Ping frame sent by services/websocket.js, matched before parsing
+PING_MESSAGE = '{"type":"ping"}'
+
+def pong_frame(connected_at: float) -> str:
+    """Reply to a ping, telling the client when to poll next."""
+    now = time.time()
+    return orjson.dumps({
+        "type": "pong",
+        "timestamp": now,
+        "next_poll_in_ms": poll_backoff_ms(now - connected_at)
+    }).decode()
+
 @app.websocket("/ws/{conversation_id}")
-async def websocket_endpoint(websocket: WebSocket, conversation_id: str):
+async def websocket_endpoint(websocket: WebSocket, conversation_id: str, version: Optional[int] = None):
     """
     WebSocket endpoint for real-time trip planning updates.
     
     Connect to this WebSocket to receive real-time updates about your
     travel planning process, including status changes, processing steps,
-    and completion notifications.
+    and completion notifications. Clients reconnecting with the `version`
+    of the last state_update they received are only sent the current
+    state if it has changed since.
     """
     await websocket.accept()
     
     # Register connection
-    if conversation_id not in active_connections:
-        active_connections[conversation_id] = set()
-    active_connections[conversation_id].add(websocket)
+    await connection_manager.register(conversation_id, websocket)
+    connected_at = time.time()
     
     try:
-        # Send initial state if conversation exists
-        if conversation_id in conversation_states:
-            state = conversation_states[conversation_id]
-            initial_update = {
-                "type": "state_update",
-                "data": {
-                    "conversation_id": conversation_id,
-                    "has_query": "query" in state,
-                    "is_valid": state.get("is_valid", False),
-                    "has_itinerary": "itinerary" in state,
-                    "awaiting_flight_selection": state.get("awaiting_flight_selection", False),
-                    "planning_complete": state.get("planning_complete", False),
-                    "has_error": "error" in state
-                }
-            }
-            await websocket.send_json(initial_update)
+        # Send initial state if conversation exists and the client is behind
+        state = await state_store.get_conversation(conversation_id)
+        if state is not None and (version is None or state.get("_version") != version):
+            await websocket.send_text(cached_state_update_frame(conversation_id, state))
         
         # Listen for messages (ping/pong, etc.)
-        async for message in websocket.iter_json():
+        async for raw_message in websocket.iter_text():
+            # Keep-alive pings are most of the traffic; answer them unparsed
+            if raw_message == PING_MESSAGE:
+                await websocket.send_text(pong_frame(connected_at))
+                continue
+            message = orjson.loads(raw_message)
             if message.get("type") == "ping":
-                await websocket.send_json({"type": "pong", "timestamp": time.time()})
+                await websocket.send_text(pong_frame(connected_at))
             elif message.get("type") == "request_state":
                 # Client requested current state
-                if conversation_id in conversation_states:
-                    state = conversation_states[conversation_id]
-                    await websocket.send_json({
-                        "type": "state_update",
-                        "data": {
-                            "conversation_id": conversation_id,
-                            "has_query": "query" in state,
-                            "is_valid": state.get("is_valid", False),
-                            "has_itinerary": "itinerary" in state,
-                            "awaiting_flight_selection": state.get("awaiting_flight_selection", False),
-                            "planning_complete": state.get("planning_complete", False),
-                            "has_error": "error" in state
-                        }
-                    })
+                state = await state_store.get_conversation(conversation_id)
+                if state is not None:
+                    await websocket.send_text(cached_state_update_frame(conversation_id, state))
     
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected for conversation: {conversation_id}")
@@ -984,32 +1093,35 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: str):
         logger.error(f"Error in WebSocket: {str(e)}")
     finally:
         # Remove connection
-        if conversation_id in active_connections:
-            active_connections[conversation_id].discard(websocket)
-            if not active_connections[conversation_id]:
-                del active_connections[conversation_id]
+        await connection_manager.unregister(conversation_id, websocket)
+
+# Index of the API, served from the root endpoint
+API_INDEX = {
+    "message": "Travel Planning API",
+    "version": "2.0.0",
+    "documentation": "/docs",
+    "redoc": "/redoc",
+    "endpoints": {
+        "travel": {
+            "query": "/travel/query - Create a new travel plan",
+            "status": "/travel/status/{job_id} - Check job status",
+            "results": "/travel/results/{conversation_id} - Get travel results",
+            "select_flight": "/travel/select-flight - Select a flight option",
+            "continue": "/travel/continue - Continue planning after flight selection",
+            "feedback": "/travel/feedback - Provide feedback on itinerary",
+            "voice": "/travel/voice - Process voice input"
+        },
+        "websocket": "/ws/{conversation_id} - Real-time updates"
+    }
+}
+
+# The index never changes, so it is serialized once; health checks hit "/" often
+API_INDEX_BYTES = orjson.dumps(API_INDEX)
 
 @app.get("/")
 async def root():
     """API root endpoint with documentation links."""
-    return {
-        "message": "Travel Planning API",
-        "version": "2.0.0",
-        "documentation": "/docs",
-        "redoc": "/redoc",
-        "endpoints": {
-            "travel": {
-                "query": "/travel/query - Create a new travel plan",
-                "status": "/travel/status/{job_id} - Check job status",
-                "results": "/travel/results/{conversation_id} - Get travel results",
-                "select_flight": "/travel/select-flight - Select a flight option",
-                "continue": "/travel/continue - Continue planning after flight selection",
-                "feedback": "/travel/feedback - Provide feedback on itinerary",
-                "voice": "/travel/voice - Process voice input"
-            },
-            "websocket": "/ws/{conversation_id} - Real-time updates"
-        }
-    }
+    return Response(content=API_INDEX_BYTES, media_type="application/json")
 
 # For running directly with uvicorn
 if __name__ == "__main__":
@@ -1019,9 +1131,42 @@ if __name__ == "__main__":
     
     print("\n✨ Starting Travel Planning API ✨")
     
+    # Jobs, conversations and WebSocket broadcasts are only shared between
+    # workers through Redis (STATE_BACKEND=redis in app.state_store); with
+    # per-process state a single worker is run. uvicorn ignores the worker
+    # count when reload is enabled.
+    workers = int(os.getenv("UVICORN_WORKERS", "4"))
+    if workers > 1 and state_store.get_redis_client() is None:
+        print("⚠️  State is per-process without STATE_BACKEND=redis; running a single worker")
+        workers = 1
+    
+    # uvicorn[standard] ships uvloop and httptools; uvloop is not available
+    # on Windows, where the default asyncio loop is used instead, and the
+    # pure-Python h11 parser stands in for a missing httptools.
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+    try:
+        import httptools  # noqa: F401
+        http = "httptools"
+    except ImportError:
+        http = "h11"
+    
     uvicorn.run(
         "app.api:app",
         host="0.0.0.0",
         port=port,
-        reload=dev_mode
+        reload=dev_mode,
+        workers=1 if dev_mode else workers,
+        loop=loop,
+        http=http,
+        ws="websockets",
+        # Room for many long-lived WebSocket clients per worker
+        backlog=int(os.getenv("UVICORN_BACKLOG", "2048")),
+        limit_concurrency=int(os.getenv("UVICORN_LIMIT_CONCURRENCY", "2000")),
+        timeout_keep_alive=30,
+        # Compresses frames for clients that negotiate it; browsers all do
+        ws_per_message_deflate=True
     ) 
\ No newline at end of file
@@ -5,17 +5,26 @@ This module provides an API endpoint for booking flights using visible
 browser automation to demonstrate the booking process.
 """
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, status
 from pydantic import BaseModel, Field
 from typing import Dict, Any, List, Optional
 import asyncio
 import os
 import logging
+import secrets
 from datetime import datetime
 
+from app import state_store
+
 # Import our visible flight booker
 from services.stagehand_flight_booker import VisibleFlightBooker
 
+# Bookings keep a browser busy for minutes. With TASK_QUEUE=celery they run
+# on Celery workers (see app.tasks); otherwise they run in this process.
+USE_TASK_QUEUE = os.getenv("TASK_QUEUE", "inline").lower() == "celery"
+if USE_TASK_QUEUE:
+    from app.tasks.flight import run_booking
+
 # Mock classes for testing without dependencies
 class MockFlightBooker:
     async def initialize(self):
@@ -32,6 +41,59 @@ class MockFlightBooker:
     async def close(self):
         pass
 
+# Browsers kept running between bookings, per process
+BOOKER_POOL_SIZE = int(os.getenv("BOOKER_POOL_SIZE", "2"))
+
+class BookerPool:
+    """
+    Pool of initialized flight bookers.
+    
+    Launching a browser dominates booking latency, so bookers are launched
+    on first use and returned to the pool afterwards. At most `size` exist
+    at once; a booker whose browser has died is closed and replaced.
+    """
+    
+    def __init__(self, size: int):
+        self._slots = asyncio.Semaphore(size)
+        self._idle: List[VisibleFlightBooker] = []
+    
+    async def acquire(self) -> VisibleFlightBooker:
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                booker = self._idle.pop()
+                if booker.is_healthy():
+                    return booker
+                await _close_booker(booker)
+            
+            booker = VisibleFlightBooker()
+            await booker.initialize()
+            return booker
+        except BaseException:
+            self._slots.release()
+            raise
+    
+    async def release(self, booker: VisibleFlightBooker):
+        try:
+            if booker.is_healthy():
+                await booker.reset()
+                self._idle.append(booker)
+            else:
+                await _close_booker(booker)
+        except Exception as e:
+            logging.warning(f"Discarding flight booker after failed reset: {str(e)}")
+            await _close_booker(booker)
+        finally:
+            self._slots.release()
+
+async def _close_booker(booker: VisibleFlightBooker):
+    try:
+        await booker.close()
+    except Exception:
+        pass
+
+booker_pool = BookerPool(BOOKER_POOL_SIZE)
+
 # Define our request models
 class PassengerInfo(BaseModel):
     first_name: str = Field(..., description="Passenger's first name")
@@ -69,17 +131,33 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+async def record_booking(
+    booking_id: str,
+    status: str,
+    message: str,
+    payment_url: Optional[str] = None,
+    error: Optional[str] = None
+):
+    """Store the booking's current status response for /status lookups."""
+    response = BookingResponse(
+        status=status,
+        message=message,
+        payment_url=payment_url,
+        booking_id=booking_id,
+        error=error
+    )
+    await state_store.save_booking(booking_id, response.model_dump_json())
+
 # Update the background task to use visible automation
 async def book_flight_task(booking_request: BookingRequest, booking_id: str):
     try:
-        booker = VisibleFlightBooker()
+        await record_booking(booking_id, status="processing", message="Booking in progress")
+        booker = await booker_pool.acquire()
         
         try:
-            await booker.initialize()
-            
             # Convert Pydantic models to dictionaries
-            flight_info = booking_request.flight_info.dict()
-            passenger_info = booking_request.passenger_info.dict()
+            flight_info = booking_request.flight_info.model_dump()
+            passenger_info = booking_request.passenger_info.model_dump()
             
             # Book the flight - this will show the browser automation
             result = await booker.book_flight(
@@ -90,12 +168,25 @@ async def book_flight_task(booking_request: BookingRequest, booking_id: str):
             
             # Store the result for retrieval later
             logging.info(f"Booking result for {booking_id}: {result}")
+            await record_booking(
+                booking_id,
+                status=result.get("status", "success"),
+                message=result.get("message", "Flight booking completed successfully"),
+                payment_url=result.get("payment_url"),
+                error=result.get("error")
+            )
             
         finally:
-            await booker.close()
+            await booker_pool.release(booker)
             
     except Exception as e:
         logging.error(f"Error in booking task for {booking_id}: {str(e)}")
+        await record_booking(
+            booking_id,
+            status="error",
+            message="Flight booking failed",
+            error=str(e)
+        )
 
 # Define our endpoint
 @router.post("/book", response_model=BookingResponse)
@@ -112,12 +203,14 @@ async def book_flight(
     """
     try:
         # Generate a booking ID
-        # In a real implementation, we would use a more robust ID generation system
-        import uuid
-        booking_id = str(uuid.uuid4())
+        booking_id = secrets.token_hex(16)
+        await record_booking(booking_id, status="pending", message="Flight booking queued")
         
-        # Start the booking process in the background
-        background_tasks.add_task(book_flight_task, booking_request, booking_id)
+        # Start the booking process on the task queue, or in the background
+        if USE_TASK_QUEUE:
+            run_booking.delay(booking_request.model_dump(), booking_id)
+        else:
+            background_tasks.add_task(book_flight_task, booking_request, booking_id)
         
         # Return an immediate response
         return BookingResponse(
@@ -139,19 +232,8 @@ async def get_booking_status(booking_id: str):
     
     This endpoint checks the status of a previously initiated flight booking process.
     """
-    try:
-        # In a real implementation, we would look up the booking status in a database
-        # For this example, we'll always return a mock successful response
-        
-        return BookingResponse(
-            status="success",
-            message="Flight booking completed successfully",
-            payment_url="https://example.com/payment",
-            booking_id=booking_id
-        )
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error checking booking status: {str(e)}"
-        ) 
\ No newline at end of file
+    payload = await state_store.get_booking(booking_id)
+    if payload is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
+    
+    return Response(content=payload, media_type="application/json")
@@ -0,0 +1,172 @@
+"""
+WebSocket connection registry for the travel planning API.
+
+Each worker only holds the sockets that connected to it. When Redis is
+configured, broadcasts are published on a per-conversation channel and every
+worker forwards them to its own sockets, so updates reach clients no matter
+which worker produced them. Without Redis, broadcasts go straight to the
+local sockets.
+"""
+
+import asyncio
+import logging
+import weakref
+from typing import Dict, List, Optional, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.state_store import RedisError
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "conv:"
+CHANNEL_SUFFIX = ":events"
+
+# Published in place of an update to close a conversation's sockets on every worker
+CLOSE_MESSAGE = "__close__"
+
+
+def channel_name(conversation_id: str) -> str:
+    """Pub/sub channel carrying a conversation's updates."""
+    return f"{CHANNEL_PREFIX}{conversation_id}{CHANNEL_SUFFIX}"
+
+
+async def _safe_close(websocket: WebSocket) -> None:
+    try:
+        await websocket.close()
+    except (WebSocketDisconnect, RuntimeError, OSError) as e:
+        # Already closed or disconnected by the client
+        logger.debug(f"Socket close failed: {e}")
+
+
+class ConnectionManager:
+    """Tracks local WebSocket connections and fans out conversation updates."""
+
+    def __init__(self, redis=None):
+        # Weak sets, so a socket dropped on an error path without unregister
+        # does not stay referenced; unregister is still needed to drop the
+        # conversation's Redis subscription
+        self._local: Dict[str, weakref.WeakSet] = {}
+        self._redis = redis
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    def has_connections(self, conversation_id: str) -> bool:
+        """Whether this worker holds any sockets for the conversation."""
+        return bool(self._local.get(conversation_id))
+
+    def connections(self, conversation_id: str) -> List[WebSocket]:
+        """Snapshot of this worker's sockets for the conversation."""
+        return list(self._local.get(conversation_id, ()))
+
+    async def register(self, conversation_id: str, websocket: WebSocket) -> None:
+        """Track a newly accepted socket."""
+        connections = self._local.setdefault(conversation_id, weakref.WeakSet())
+        first = not connections
+        connections.add(websocket)
+        if first and self._redis is not None:
+            await self._subscribe(conversation_id)
+
+    async def unregister(self, conversation_id: str, websocket: WebSocket) -> None:
+        """Forget a socket, dropping the subscription with the last one."""
+        await self._discard(conversation_id, {websocket})
+
+    async def _discard(self, conversation_id: str, websockets: Set[WebSocket]) -> None:
+        connections = self._local.get(conversation_id)
+        if connections is None:
+            return
+        connections.difference_update(websockets)
+        if not connections:
+            del self._local[conversation_id]
+            if self._pubsub is not None:
+                await self._unsubscribe(conversation_id)
+
+    async def publish(self, conversation_id: str, payload: str) -> None:
+        """Deliver a serialized message to every subscriber of a conversation."""
+        if self._redis is not None:
+            try:
+                await self._redis.publish(channel_name(conversation_id), payload)
+                return
+            except (RedisError, OSError) as e:
+                logger.warning(f"Redis publish failed for {conversation_id}, sending locally: {e}")
+        await self.send_local(conversation_id, payload)
+
+    async def send_local(self, conversation_id: str, payload: str) -> None:
+        """Send a serialized message to this worker's sockets for a conversation."""
+        connections = self.connections(conversation_id)
+        if not connections:
+            if conversation_id in self._local:
+                # Every socket was garbage collected; forget the conversation
+                await self._discard(conversation_id, set())
+            return
+
+        results = await asyncio.gather(
+            *[conn.send_text(payload) for conn in connections],
+            return_exceptions=True
+        )
+
+        # Handle dead connections
+        dead = {connection for connection, result in zip(connections, results) if isinstance(result, Exception)}
+        if dead:
+            await self._close(conversation_id, dead)
+
+    async def close_everywhere(self, conversation_id: str) -> None:
+        """Close a conversation's sockets on every worker."""
+        if self._redis is not None:
+            try:
+                await self._redis.publish(channel_name(conversation_id), CLOSE_MESSAGE)
+                return
+            except (RedisError, OSError) as e:
+                logger.warning(f"Redis publish failed for {conversation_id}, closing locally: {e}")
+        await self.close_all(conversation_id)
+
+    async def close_all(self, conversation_id: str) -> None:
+        """Close and forget this worker's sockets for a conversation."""
+        connections = set(self.connections(conversation_id))
+        if connections:
+            await self._close(conversation_id, connections)
+
+    async def _close(self, conversation_id: str, websockets: Set[WebSocket]) -> None:
+        """Close sockets concurrently, then forget them in one step."""
+        async with asyncio.TaskGroup() as tg:
+            for websocket in websockets:
+                tg.create_task(_safe_close(websocket))
+        await self._discard(conversation_id, websockets)
+
+    async def _subscribe(self, conversation_id: str) -> None:
+        try:
+            if self._pubsub is None:
+                self._pubsub = self._redis.pubsub()
+            await self._pubsub.subscribe(channel_name(conversation_id))
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read_messages())
+        except (RedisError, OSError) as e:
+            logger.warning(f"Redis subscribe failed for {conversation_id}: {e}")
+
+    async def _unsubscribe(self, conversation_id: str) -> None:
+        try:
+            await self._pubsub.unsubscribe(channel_name(conversation_id))
+        except (RedisError, OSError) as e:
+            logger.warning(f"Redis unsubscribe failed for {conversation_id}: {e}")
+
+    async def _read_messages(self) -> None:
+        """Forward published messages to the local sockets they belong to."""
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except (RedisError, OSError) as e:
+                logger.error(f"Redis pub/sub reader failed: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if message is None:
+                if not self._local:
+                    # Nothing left to deliver to; the next register restarts the reader
+                    return
+                continue
+
+            channel = message["channel"]
+            conversation_id = channel[len(CHANNEL_PREFIX):-len(CHANNEL_SUFFIX)]
+            if message["data"] == CLOSE_MESSAGE:
+                await self.close_all(conversation_id)
+            else:
+                await self.send_local(conversation_id, message["data"])
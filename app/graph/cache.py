@@ -0,0 +1,98 @@
+"""
+Cache for the trip planner's agent results.
+
+Agents answer from the trip metadata alone, so two trips with the same
+destination, dates and travellers get the same flights, hotel and places.
+AgentCache wraps an agent branch so that its result is looked up in
+app.state_store first, keyed on the agent and the metadata fields it
+reads, and only computed on a miss.
+
+A resumed session (see TripPlannerGraph.process, which reloads the saved
+state) already carries the agents' results. Each result is tagged in
+state["agent_inputs"] with the key of the inputs it was computed from, and
+the agent is skipped entirely while those inputs are unchanged.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+from app import state_store
+from app.utils.logger import logger
+
+Branch = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+class AgentCache:
+    """Caches agent results in the state store and counts hits and misses."""
+    
+    def __init__(self):
+        self.stats = {"hits": 0, "misses": 0, "reused": 0}
+    
+    @staticmethod
+    def inputs(state: Dict[str, Any], key_fields: Sequence[str]) -> Optional[Dict[str, Any]]:
+        """
+        Pick the metadata fields an agent depends on.
+        
+        Returns None when the state has no metadata, in which case the
+        agent is run without caching.
+        """
+        metadata = state.get("metadata")
+        if metadata is None:
+            return None
+        inputs = {}
+        for field in key_fields:
+            value = metadata.get(field) if isinstance(metadata, dict) else getattr(metadata, field, None)
+            # Destinations typed differently should still share an entry
+            if isinstance(value, str):
+                value = state_store.normalize_query(value)
+            inputs[field] = value
+        return inputs
+    
+    def wrap(
+        self,
+        name: str,
+        branch: Branch,
+        key_fields: Sequence[str],
+        output_key: Optional[str] = None
+    ) -> Branch:
+        """
+        Wrap an agent branch with the cache.
+        
+        Args:
+            name: Agent name, used in the cache key
+            branch: Graph node returning the state keys the agent produced
+            key_fields: Metadata fields the agent's result depends on
+            output_key: State key the agent fills in; when the state already
+                holds a result computed from the same inputs, the agent is skipped
+            
+        Returns:
+            Graph node with the same signature
+        """
+        async def cached(state: Dict[str, Any]) -> Dict[str, Any]:
+            inputs = self.inputs(state, key_fields)
+            if inputs is None:
+                return await branch(state)
+            
+            key = state_store.agent_cache_key(name, inputs)
+            if output_key and state.get(output_key) and (state.get("agent_inputs") or {}).get(name) == key:
+                self.stats["reused"] += 1
+                return {}
+            
+            result = await state_store.get_cached_agent_result(name, inputs)
+            if result is not None:
+                self.stats["hits"] += 1
+                logger.debug(f"Agent cache hit for {name}")
+            else:
+                self.stats["misses"] += 1
+                result = await branch(state)
+                # Failed or empty runs are retried next time rather than cached
+                if not result or result.get("error"):
+                    return result
+                await state_store.cache_agent_result(name, inputs, result)
+            
+            if output_key:
+                result = {**result, "agent_inputs": {name: key}}
+            return result
+        
+        cached.__name__ = getattr(branch, "__name__", name)
+        return cached
+
+agent_cache = AgentCache()
@@ -1,18 +1,26 @@
-from typing import Dict, Any, TypedDict, Optional, List, Set
+from typing import Annotated, AsyncIterator, Awaitable, Callable, Dict, Any, TypedDict, Optional, List, Set
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
-from app.nodes.chat_input_node import chat_input_node
-from app.nodes.intent_parser_node import intent_parser_node
-from app.nodes.trip_validator_node import trip_validator_node, process_user_response
-from app.nodes.planner_node import agent_selector_node
-from app.nodes.agents.flights_node import flights_node
-from app.nodes.agents.places_node import fetch_attractions, fetch_restaurants
-from app.nodes.agents.itinerary_planner_node import itinerary_planner_node
-from app.nodes.agents.hotel_node import hotel_node
+from app.graph.cache import agent_cache
+from app.schemas.trip_schema import TripData
+from app.state_store import InMemoryBackend, dumps, loads
 from app.utils.logger import logger
 from supabase import create_client, Client
 import os
-import json
+import hashlib
+import logging
 import uuid
+import asyncio
+import importlib
+import threading
+
+def last_write(current: Any, update: Any) -> Any:
+    """Reducer for keys that parallel agents may all write; the last write wins."""
+    return update
+
+def merge_dicts(current: Optional[Dict[str, Any]], update: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Reducer for dict keys that parallel agents each add entries to."""
+    return {**(current or {}), **(update or {})}
 
 class GraphState(TypedDict):
     """State for the LangGraph pipeline."""
@@ -22,7 +30,7 @@ class GraphState(TypedDict):
     metadata: Dict[str, Any]
     is_valid: bool
     next_question: Optional[str]
-    error: Optional[str]
+    error: Annotated[Optional[str], last_write]  # Any of the parallel agents may set it
     thought: Optional[str]
     action: Optional[str]
     action_input: Optional[Dict[str, Any]]
@@ -37,25 +45,188 @@ class GraphState(TypedDict):
     places: List[Dict[str, Any]]
     restaurants: List[Dict[str, Any]]
     hotel: Dict[str, Any]
+    agent_inputs: Annotated[Dict[str, str], merge_dicts]  # Cache key of the inputs behind each agent's result
     daily_itineraries: List[Dict[str, Any]]  # Store itineraries for each day
     final_itinerary: Optional[Dict[str, Any]]  # Final merged itinerary
     visited_places: Set[str]  # Track places that have been added to the itinerary
     visited_restaurants: Set[str]  # Track restaurants that have been added to the itinerary
 
+# Pipeline nodes around the agents, as (module, function) like the agents below
+CORE_NODES = {
+    "chat_input": ("app.nodes.chat_input_node", "chat_input_node"),
+    "intent_parser": ("app.nodes.intent_parser_node", "intent_parser_node"),
+    "validator": ("app.nodes.trip_validator_node", "trip_validator_node"),
+    "agent_selector": ("app.nodes.planner_node", "agent_selector_node"),
+    "itinerary_planner": ("app.nodes.agents.itinerary_planner_node", "plan_all_days"),
+}
+
+# Agents that only read trip metadata; they run as parallel branches.
+# Given as (module, function) and imported when the graph is built, since
+# the agent modules pull in the API clients.
+PARALLEL_AGENTS = {
+    "flights_agent": ("app.nodes.agents.flights_node", "flights_node"),
+    "hotels_agent": ("app.nodes.agents.hotel_node", "hotel_node"),
+    "attractions_agent": ("app.nodes.agents.places_node", "fetch_attractions"),
+    "restaurants_agent": ("app.nodes.agents.places_node", "fetch_restaurants"),
+}
+
+# State key each agent fills in
+AGENT_OUTPUT_KEYS = {
+    "flights_agent": "flights",
+    "hotels_agent": "hotel",
+    "attractions_agent": "places",
+    "restaurants_agent": "restaurants",
+}
+
+# Metadata fields each agent's result depends on; results are cached on them
+AGENT_CACHE_FIELDS = {
+    "flights_agent": ("source", "destination", "start_date", "end_date", "num_people"),
+    "hotels_agent": ("destination", "start_date", "end_date", "num_people", "preferences"),
+    "attractions_agent": ("destination", "preferences"),
+    "restaurants_agent": ("destination", "preferences"),
+}
+
+# How long a session's state, once loaded or saved, is served without
+# asking Supabase again; short, since another worker may save it meanwhile
+LOADED_STATE_TTL = int(os.getenv("LOADED_STATE_TTL", "30"))
+LOADED_STATE_MAX_ENTRIES = int(os.getenv("LOADED_STATE_MAX_ENTRIES", "1000"))
+
+def load_node(module: str, function: str):
+    """Import a node function on first use."""
+    return getattr(importlib.import_module(module), function)
+
+def state_delta(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Keys a node added or replaced, for returning as its update.
+    
+    LangGraph merges a node's return value key by key, so returning only
+    what changed keeps each step proportional to the change rather than
+    to the whole state.
+    """
+    return {
+        key: value for key, value in after.items()
+        if key not in before or before[key] is not value
+    }
+
+def agent_branch(name: str, agent):
+    """
+    Wrap an agent as a parallel graph branch.
+    
+    Branches running in the same step may not write the same keys, so the
+    agent runs on its own copy of the state and only the keys it added or
+    replaced are returned. A failing agent is logged and contributes
+    nothing, so the other results are kept.
+    """
+    async def branch(state: GraphState) -> Dict[str, Any]:
+        try:
+            result = await agent(dict(state))
+        except Exception as e:
+            logger.error(f"Error in {name}: {str(e)}")
+            return {}
+        return state_delta(state, result)
+    branch.__name__ = name
+    return branch
+
+# Branches a valid trip fans out to
+AGENT_FANOUT = list(PARALLEL_AGENTS)
+
+# Unconditional edges; the validator's routing is the only conditional one
+GRAPH_EDGES = (
+    ("chat_input", "intent_parser"),
+    ("intent_parser", "validator"),
+    # Answers go through agent_selector and back to the validator
+    ("process_response", "agent_selector"),
+    ("agent_selector", "validator"),
+    # Plan the itinerary once all agent results are in; all days are
+    # planned together, in a single step
+    (AGENT_FANOUT, "itinerary_planner"),
+    ("itinerary_planner", "end"),
+)
+
+def route_after_validation(state: GraphState):
+    """Send a valid trip to every agent at once, otherwise ask the user for more details."""
+    return AGENT_FANOUT if state.get("is_valid") else "process_response"
+
+async def end_node(state: GraphState) -> Dict[str, Any]:
+    """End node; the final state is already complete, so nothing changes."""
+    return {}
+
+async def process_response_node(state: GraphState, config: RunnableConfig) -> Dict[str, Any]:
+    """
+    Ask the user the validator's follow-up question and process the answer.
+    
+    Args:
+        state: Current state, possibly holding a next_question
+        config: Run config; its "save_state" entry persists the state
+            before and after the user answers
+        
+    Returns:
+        The keys the answer added or replaced
+    """
+    from app.nodes.trip_validator_node import process_user_response
+    
+    save_state: Callable[[Dict[str, Any]], Awaitable[None]] = config["configurable"]["save_state"]
+    
+    before = dict(state)
+    # Get the question from state
+    question = state.get("next_question")
+    if question:
+        # Save the state before asking the user
+        await save_state(state)
+        print("\n" + "="*80)
+        print(question)
+        print("="*80 + "\n")
+        # Get user input in a thread so other trips keep running meanwhile
+        user_response = await asyncio.to_thread(input, "Your response: ")
+        # Update state with user response
+        state["user_response"] = user_response
+    # Process the response and get updated state
+    updated_state = await process_user_response(state, state.get("user_response", ""))
+    # Save the state after processing response
+    await save_state(updated_state)
+    # Return only what the response changed
+    return state_delta(before, updated_state)
+
+def state_digest(payload: str) -> bytes:
+    """Short fingerprint of a serialized state, to tell whether it changed."""
+    return hashlib.blake2b(payload.encode(), digest_size=16).digest()
+
 class TripPlannerGraph:
     """
     Main LangGraph workflow for the AI Travel Planner.
     Orchestrates the core nodes and defines the execution flow.
     """
     
+    # The workflow is static, so it is compiled once and shared by every
+    # instance, as is the Supabase client. The lock keeps instances created
+    # from several threads (e.g. worker threads) from building them twice.
+    _compiled_graph = None
+    _supabase: Optional[Client] = None
+    _init_lock = threading.Lock()
+    
+    # Saves and loads go through these whichever instance makes them, so
+    # each session has a single writer and one cached copy per process.
+    # Latest unsaved state per session, and the task writing it out
+    _pending_states: Dict[str, str] = {}
+    _state_writers: Dict[str, asyncio.Task] = {}
+    # Digest of the state last written for each session, to skip
+    # rewriting an unchanged state
+    _saved_digests = InMemoryBackend()
+    # Serialized state of recently loaded or saved sessions
+    _loaded_states = InMemoryBackend(max_entries=LOADED_STATE_MAX_ENTRIES)
+    
     def __init__(self):
         """Initialize the trip planner graph."""
-        self.graph = self._build()
-        # Initialize Supabase client
-        self.supabase: Client = create_client(
-            os.getenv("SUPABASE_URL"),
-            os.getenv("SUPABASE_KEY")
-        )
+        with TripPlannerGraph._init_lock:
+            if TripPlannerGraph._supabase is None:
+                TripPlannerGraph._supabase = create_client(
+                    os.getenv("SUPABASE_URL"),
+                    os.getenv("SUPABASE_KEY")
+                )
+            if TripPlannerGraph._compiled_graph is None:
+                TripPlannerGraph._compiled_graph = self._build()
+        self.supabase: Client = TripPlannerGraph._supabase
+        self.graph = TripPlannerGraph._compiled_graph
     
     def _build(self) -> StateGraph:
         """
@@ -67,85 +238,38 @@ class TripPlannerGraph:
         # Create the graph with state schema
         workflow = StateGraph(state_schema=GraphState)
         
-        # Add core nodes
-        workflow.add_node("chat_input", chat_input_node)
-        workflow.add_node("intent_parser", intent_parser_node)
-        workflow.add_node("validator", trip_validator_node)
-        workflow.add_node("agent_selector", agent_selector_node)
+        # Add core nodes; their modules are imported here rather than at
+        # module level so that importing this module stays cheap
+        for name, (module, function) in CORE_NODES.items():
+            workflow.add_node(name, load_node(module, function))
         
         # Add end node
-        async def end_node(state):
-            """End node that returns the final state."""
-            return state
         workflow.add_node("end", end_node)
         
-        # Create an async wrapper for process_user_response
-        async def process_response_wrapper(state):
-            # Get the question from state
-            question = state.get("next_question")
-            if question:
-                # Save the state before asking the user
-                await self.save_state(state)
-                print("\n" + "="*80)
-                print(question)
-                print("="*80 + "\n")
-                # Get user input
-                user_response = input("Your response: ")
-                # Update state with user response
-                state["user_response"] = user_response
-            # Process the response and get updated state
-            updated_state = await process_user_response(state, state.get("user_response", ""))
-            # Save the state after processing response
-            await self.save_state(updated_state)
-            # Return the complete updated state
-            return updated_state
-            
-        workflow.add_node("process_response", process_response_wrapper)
-        
-        # Add agent nodes
-        workflow.add_node("flights_agent", flights_node)
-        workflow.add_node("hotels_agent", hotel_node)
-        workflow.add_node("attractions_agent", fetch_attractions)
-        workflow.add_node("restaurants_agent", fetch_restaurants)
-        workflow.add_node("itinerary_planner", itinerary_planner_node)
+        # Ask the validator's question and process the answer; the graph is
+        # shared, so the saver comes from each run's config
+        workflow.add_node("process_response", process_response_node)
         
-        # Add edges
-        workflow.add_edge("chat_input", "intent_parser")
-        workflow.add_edge("intent_parser", "validator")
+        # Add agent nodes; flights, hotels, attractions and restaurants are
+        # independent and run as parallel branches
+        for name, (module, function) in PARALLEL_AGENTS.items():
+            agent = load_node(module, function)
+            workflow.add_node(name, agent_cache.wrap(
+                name, agent_branch(name, agent), AGENT_CACHE_FIELDS[name], AGENT_OUTPUT_KEYS[name]
+            ))
         
-        # Add conditional edges for validation and stop condition
+        # A valid trip fans out to every agent in the same step
         workflow.add_conditional_edges(
             "validator",
-            lambda x: "flights_agent" if x.get("is_valid") else "process_response",
+            route_after_validation,
             {
                 "process_response": "process_response",
-                "flights_agent": "flights_agent"
+                **{name: name for name in AGENT_FANOUT}
             }
         )
         
-        # Add edge from process_response to agent_selector instead of back to validator
-        workflow.add_edge("process_response", "agent_selector")
-        
-        # Add edge from agent_selector to validator
-        workflow.add_edge("agent_selector", "validator")
-        
-        # Add sequential edges for the new flow
-        workflow.add_edge("flights_agent", "hotels_agent")  # First get flights, then hotels
-        workflow.add_edge("hotels_agent", "attractions_agent")  # Then get attractions
-        workflow.add_edge("attractions_agent", "restaurants_agent")  # Then get restaurants
-        workflow.add_edge("restaurants_agent", "itinerary_planner")  # Then plan itinerary
-        
-        # Add conditional edge for daily planning
-        def should_continue(state: GraphState) -> str:
-            """Determine if we should continue planning or end."""
-            if state["current_day"] < state["total_days"]:
-                return "itinerary_planner"
-            return "end"
-        
-        workflow.add_conditional_edges(
-            "itinerary_planner",
-            should_continue
-        )
+        for start, end in GRAPH_EDGES:
+            workflow.add_edge(start, end)
         
         # Set entry and end points
         workflow.set_entry_point("chat_input")
@@ -155,28 +279,34 @@ class TripPlannerGraph:
         return workflow.compile()
     
     async def save_state(self, state: Dict[str, Any]) -> None:
-        """Save the current state to Supabase."""
+        """
+        Save the current state to Supabase.
+        
+        Each session's writes go through one writer task. A save made while
+        an earlier one is still in flight replaces whatever state was
+        waiting behind it, since the upsert only keeps the latest anyway.
+        A state identical to the one last written is not written again.
+        """
+        session_id = state["session_id"]
         try:
-            # Convert sets to lists for JSON serialization
-            state_to_save = {
-                **state,
-                "visited_places": list(state.get("visited_places", set())),
-                "visited_restaurants": list(state.get("visited_restaurants", set()))
-            }
-            
-            # Convert TripMetadata to dict if present
-            if "metadata" in state_to_save and hasattr(state_to_save["metadata"], "model_dump"):
-                state_to_save["metadata"] = state_to_save["metadata"].model_dump()
-            
-            logger.info(f"Saving state for session {state['session_id']}")
-            logger.debug(f"State content: {json.dumps(state_to_save, indent=2)}")
+            logger.info(f"Saving state for session {session_id}")
+            # Sets become lists and TripMetadata a dict as they are serialized
+            payload = dumps(state)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"State content: {payload}")
             
-            # Save to Supabase
-            self.supabase.table("trip_states").upsert({
-                "session_id": state["session_id"],
-                "state": json.dumps(state_to_save),
-                "updated_at": "now()"
-            }).execute()
+            unchanged = await TripPlannerGraph._saved_digests.get(session_id) == state_digest(payload)
+            writer = TripPlannerGraph._state_writers.get(session_id)
+            if writer is None or writer.done():
+                if unchanged:
+                    logger.info("State unchanged since the last save")
+                    return
+                writer = asyncio.create_task(self._write_states(session_id))
+                TripPlannerGraph._state_writers[session_id] = writer
+            TripPlannerGraph._pending_states[session_id] = payload
+            # Shielded so that a cancelled caller does not abort the write
+            # other callers are waiting on
+            await asyncio.shield(writer)
             
             logger.info("State saved successfully")
             
@@ -184,28 +314,54 @@ class TripPlannerGraph:
             logger.error(f"Error saving state to Supabase: {str(e)}")
             raise
     
+    async def _write_states(self, session_id: str) -> None:
+        """Upsert the session's latest pending state until none is left."""
+        while session_id in TripPlannerGraph._pending_states:
+            payload = TripPlannerGraph._pending_states.pop(session_id)
+            # The Supabase client is synchronous; keep it off the event loop
+            await asyncio.to_thread(self._upsert_state, session_id, payload)
+            await TripPlannerGraph._saved_digests.set(session_id, state_digest(payload))
+            await TripPlannerGraph._loaded_states.set(session_id, payload, LOADED_STATE_TTL)
+        TripPlannerGraph._state_writers.pop(session_id, None)
+    
+    def _upsert_state(self, session_id: str, payload: str) -> None:
+        self.supabase.table("trip_states").upsert({
+            "session_id": session_id,
+            "state": payload,
+            "updated_at": "now()"
+        }).execute()
+    
     async def load_state(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Load the state from Supabase."""
         try:
             logger.info(f"Loading state for session {session_id}")
             
-            response = self.supabase.table("trip_states")\
-                .select("state")\
-                .eq("session_id", session_id)\
-                .order("updated_at", desc=True)\
-                .limit(1)\
-                .execute()
+            cached = await TripPlannerGraph._loaded_states.get(session_id)
+            if cached is not None:
+                logger.info("State loaded from cache")
+                return loads(cached)
+            
+            # The Supabase client is synchronous; keep it off the event loop
+            response = await asyncio.to_thread(
+                self.supabase.table("trip_states")
+                .select("state")
+                .eq("session_id", session_id)
+                .order("updated_at", desc=True)
+                .limit(1)
+                .execute
+            )
             
             if response.data and len(response.data) > 0:
                 state_data = response.data[0]["state"]
                 if isinstance(state_data, str):
-                    state = json.loads(state_data)
+                    state = loads(state_data)
                 else:
                     state = state_data
-                # Recursively convert sets to lists
-                state = self._convert_sets_to_lists(state)
+                    state_data = dumps(state)
+                await TripPlannerGraph._loaded_states.set(session_id, state_data, LOADED_STATE_TTL)
                 logger.info("State loaded successfully")
-                logger.debug(f"Loaded state: {json.dumps(state, indent=2)}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Loaded state: {dumps(state)}")
                 return state
             logger.info("No existing state found")
             return None
@@ -214,16 +370,51 @@ class TripPlannerGraph:
             logger.error(f"Error loading state from Supabase: {str(e)}")
             return None
 
-    def _convert_sets_to_lists(self, obj):
-        """Recursively convert sets to lists in the given object."""
-        if isinstance(obj, set):
-            return list(obj)
-        elif isinstance(obj, dict):
-            return {k: self._convert_sets_to_lists(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [self._convert_sets_to_lists(item) for item in obj]
-        else:
-            return obj
+    async def _initial_state(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Resume the session's saved state, if any, and reset the per-run planning fields."""
+        # Generate or use existing session_id
+        if "session_id" not in state:
+            state["session_id"] = str(uuid.uuid4())
+        
+        # Load existing state if available
+        existing_state = await self.load_state(state["session_id"])
+        if existing_state:
+            state = {**existing_state, **state}
+        
+        # Initialize state for multi-day planning
+        state["current_day"] = 1
+        state["total_days"] = state.get("metadata", {}).get("duration", 1)
+        state["destination"] = state.get("metadata", {}).get("destination", "Unknown")
+        state["start_date"] = state.get("metadata", {}).get("start_date", "")
+        state["daily_itineraries"] = []
+        # Keep what a resumed session already visited; it is saved as lists
+        state["visited_places"] = set(state.get("visited_places") or ())
+        state["visited_restaurants"] = set(state.get("visited_restaurants") or ())
+        state["final_itinerary"] = None
+        return state
+    
+    async def process_stream(self, state: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a travel query, yielding the state after every graph step.
+        
+        Callers can show agent results (flights, hotel, places) as soon as
+        they arrive instead of waiting for the whole itinerary. The last
+        state yielded is the final one, which is also saved.
+        
+        Args:
+            state: Initial state containing the query
+            
+        Yields:
+            The full state after each step
+        """
+        state = await self._initial_state(state)
+        result = state
+        config = {"configurable": {"save_state": self.save_state}}
+        async for result in self.graph.astream(state, config, stream_mode="values"):
+            yield result
+        
+        # Save the final state
+        await self.save_state(result)
     
     async def process(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -236,37 +427,65 @@ class TripPlannerGraph:
             Updated state with results or error
         """
         try:
-            # Generate or use existing session_id
-            if "session_id" not in state:
-                state["session_id"] = str(uuid.uuid4())
+            result = state
+            async for result in self.process_stream(state):
+                pass
+            return result
             
-            # Load existing state if available
-            existing_state = await self.load_state(state["session_id"])
-            if existing_state:
-                state = {**existing_state, **state}
+        except Exception as e:
+            logger.error(f"Error in graph processing: {str(e)}")
+            return {
+                **state,
+                "is_valid": False,
+                "error": str(e)
+            }
+    
+    async def process_with_trip_data(self, trip_data: TripData) -> Dict[str, Any]:
+        """
+        Plan an itinerary from already structured trip data.
+        
+        Parsing, validation and the agent lookups are skipped because the
+        trip data already carries their results; the whole model is
+        converted to state with a single model_dump().
+        
+        Args:
+            trip_data: Trip metadata plus flights, hotel, places, restaurants and budget
+            
+        Returns:
+            Final state, with the merged itinerary under "itinerary"
+        """
+        try:
+            state = trip_data.model_dump(exclude_none=True)
+            
+            metadata = trip_data.metadata
+            total_days = 1
+            if metadata.start_date and metadata.end_date:
+                total_days = max((metadata.end_date - metadata.start_date).days + 1, 1)
             
             # Initialize state for multi-day planning
-            state["current_day"] = 1
-            state["total_days"] = state.get("metadata", {}).get("duration", 1)
-            state["destination"] = state.get("metadata", {}).get("destination", "Unknown")
-            state["start_date"] = state.get("metadata", {}).get("start_date", "")
-            state["daily_itineraries"] = []
-            state["visited_places"] = set()
-            state["visited_restaurants"] = set()
-            state["final_itinerary"] = None
+            state.update({
+                "session_id": str(uuid.uuid4()),
+                "is_valid": True,
+                "current_day": 1,
+                "total_days": total_days,
+                "destination": metadata.destination or "Unknown",
+                "start_date": metadata.start_date.strftime("%Y-%m-%d") if metadata.start_date else "",
+                "daily_itineraries": [],
+                "visited_places": set(),
+                "visited_restaurants": set(),
+                "final_itinerary": None
+            })
             
-            # Run the graph
-            result = await self.graph.ainvoke(state)
+            from app.nodes.agents.itinerary_planner_node import plan_all_days
             
-            # Save the updated state
-            await self.save_state(result)
+            state = await plan_all_days(state)
             
-            return result
+            state["itinerary"] = state.get("final_itinerary")
+            return state
             
         except Exception as e:
-            logger.error(f"Error in graph processing: {str(e)}")
+            logger.error(f"Error planning from trip data: {str(e)}")
             return {
-                **state,
                 "is_valid": False,
                 "error": str(e)
-            } 
\ No newline at end of file
+            }
@@ -1,26 +1,31 @@
-from fastapi import FastAPI, HTTPException, File, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, File, UploadFile, WebSocket, WebSocketDisconnect, Response
 from pydantic import BaseModel
 from app.graph.trip_planner_graph import TripPlannerGraph
 from app.schemas.trip_schema import TripData, TripMetadata
-from typing import Optional, List, Dict, Any, Set
-import tempfile
+from typing import Optional, List, Dict, Any, Set, AsyncIterator
 import os
-import shutil
 import uuid
 from endpoints.services.llm_service import parse_user_input
 from endpoints.services.speech_to_text import transcribe_audio
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 import subprocess
 import time
 from pathlib import Path
 from dotenv import load_dotenv
 import logging
 import asyncio
+import copy
+import traceback
 import json
+import orjson
 
 # Import our utility modules
 from app.utils.logger import logger
 from app.utils.anthropic_client import anthropic_client
+from app import state_store
+from app.utils.http_client import close_http_clients
+from app.utils.uploads import save_upload, save_upload_to_temp
 
 # Import our pipeline functions
 from app.pipeline import process_travel_query, process_feedback, Spinner
@@ -48,8 +53,9 @@ from app.nodes.trip_validator_node import trip_validator_node, process_user_resp
 from app.nodes.chat_input_node import chat_input_node
 from app.nodes.intent_parser_node import intent_parser_node
 # Add missing node imports
-from app.nodes.planner_node import planner_node
-from app.nodes.agent_nodes import flights_node, places_node, restaurants_node, hotel_node, budget_node, reviews_node, route_node
+from app.nodes.planner_node import agent_selector_node as planner_node
+from app.nodes.agents.reviews_node import reviews_node
+from app.nodes.agent_runner import NODE_REGISTRY, run_agent_nodes
 from app.nodes.summary_node import summary_node
 # Import flight selection node
 from app.nodes.flight_selection_node import display_flight_options, get_user_flight_selection
@@ -72,6 +78,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -82,6 +89,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("shutdown")
+async def close_shared_clients():
+    """Release pooled outbound HTTP connections."""
+    await close_http_clients()
+
 # Initialize the graph
 trip_planner = TripPlannerGraph()
 
@@ -131,7 +143,7 @@ async def handle_interaction(request: ChatRequest):
     """
     try:
         # Setup a proper logger
-        logger.info(f"Received interaction: {request.dict()}")
+        logger.info(f"Received interaction: {request.model_dump()}")
         
         # Initialize or get conversation state
         state = conversation_states.get(request.conversation_id, {})
@@ -175,7 +187,6 @@ async def handle_interaction(request: ChatRequest):
             
     except Exception as e:
         logger.error(f"Error in handle_interaction: {str(e)}")
-        import traceback
         traceback.print_exc()
         
         # Send error update via WebSocket
@@ -431,17 +442,21 @@ async def generate_itinerary(trip_data: TripData):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Served from the root endpoint; serialized once since it never changes
+API_INDEX_BYTES = orjson.dumps({
+    "message": "Welcome to AI Travel Planner API",
+    "endpoints": {
+        "/interact": "For all types of interactions",
+        "/chat/stream": "Chat messages, streaming each step as server-sent events",
+        "/generate-itinerary": "For structured trip data",
+        "/conversations": "Create new conversations",
+        "/search": "Search for travel options"
+    }
+})
+
 @app.get("/")
 async def root():
-    return {
-        "message": "Welcome to AI Travel Planner API",
-        "endpoints": {
-            "/interact": "For all types of interactions",
-            "/generate-itinerary": "For structured trip data",
-            "/conversations": "Create new conversations",
-            "/search": "Search for travel options"
-        }
-    }
+    return Response(content=API_INDEX_BYTES, media_type="application/json")
 
 @app.post("/conversations")
 async def create_conversation():
@@ -471,6 +486,63 @@ async def search_travel_options(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# State keys the agent nodes fill in, named like the nodes themselves
+AGENT_RESULT_KEYS = tuple(NODE_REGISTRY)
+
+def sse_frame(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {state_store.dumps(data)}\n\n"
+
+async def stream_travel_query(query: str) -> AsyncIterator[str]:
+    """
+    Run a query through the same nodes as /analyze-input, yielding an SSE
+    frame with each step's result as soon as that step finishes.
+    
+    Events are intent, validation, agents and itinerary, in that order;
+    an error event ends the stream early.
+    """
+    try:
+        state = await chat_input_node({"query": query})
+        state = await intent_parser_node(state)
+        if state.get("error") or not state.get("metadata"):
+            yield sse_frame("error", {"error": state.get("error") or "No metadata was extracted"})
+            return
+        yield sse_frame("intent", {"metadata": state["metadata"]})
+        
+        state = await trip_validator_node(state)
+        if not state.get("is_valid", False):
+            yield sse_frame("validation", {
+                "is_valid": False,
+                "validation_errors": state.get("validation_errors", ["Unknown validation error"])
+            })
+            return
+        yield sse_frame("validation", {"is_valid": True})
+        
+        state = await planner_node(state)
+        state = await run_agent_nodes(state, state.get("nodes_to_call", []))
+        yield sse_frame("agents", {key: state[key] for key in AGENT_RESULT_KEYS if key in state})
+        
+        state = await reviews_node(state)
+        state = await summary_node(state)
+        if state.get("error"):
+            yield sse_frame("error", {"error": state["error"]})
+            return
+        yield sse_frame("itinerary", {
+            "trip_summary": state.get("trip_summary", {}),
+            "daily_itinerary": state.get("daily_itinerary", {}),
+            "review_highlights": state.get("review_highlights", {})
+        })
+    except Exception as e:
+        logger.error(f"Error streaming travel query: {str(e)}")
+        yield sse_frame("error", {"error": str(e)})
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Plan a trip from a chat message, streaming each step's result as server-sent events."""
+    if not request.message:
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+    return StreamingResponse(stream_travel_query(request.message), media_type="text/event-stream")
+
 @app.post("/analyze-input")
 async def analyze_input(request: AnalyzeInputRequest):
     try:
@@ -526,29 +598,7 @@ async def analyze_input(request: AnalyzeInputRequest):
             nodes_to_call = state.get('nodes_to_call', [])
             print(f"[DEBUG] Nodes to call: {nodes_to_call}")
             
-            if 'flights' in nodes_to_call:
-                print("[DEBUG] Processing with flights_node")
-                state = await flights_node(state)
-            
-            if 'route' in nodes_to_call:
-                print("[DEBUG] Processing with route_node")
-                state = await route_node(state)
-            
-            if 'places' in nodes_to_call:
-                print("[DEBUG] Processing with places_node")
-                state = await places_node(state)
-            
-            if 'restaurants' in nodes_to_call:
-                print("[DEBUG] Processing with restaurants_node")
-                state = await restaurants_node(state)
-            
-            if 'hotel' in nodes_to_call:
-                print("[DEBUG] Processing with hotel_node")
-                state = await hotel_node(state)
-            
-            if 'budget' in nodes_to_call:
-                print("[DEBUG] Processing with budget_node")
-                state = await budget_node(state)
+            state = await run_agent_nodes(state, nodes_to_call)
             
             # Step 6: Reviews Node
             print("[DEBUG] Processing with reviews_node")
@@ -627,7 +677,6 @@ async def analyze_input(request: AnalyzeInputRequest):
                 }
         except Exception as planning_error:
             print(f"[ERROR] Trip planning failed: {str(planning_error)}")
-            import traceback
             traceback.print_exc()
             return {
                 "success": False, 
@@ -636,7 +685,6 @@ async def analyze_input(request: AnalyzeInputRequest):
             }
     except Exception as e:
         print(f"[ERROR] Request processing error: {str(e)}")
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -650,17 +698,15 @@ async def voice_input(file: UploadFile = File(...), keep_debug_files: bool = Fal
         print(f"[DEBUG] Received file: {filename}, Content-Type: {content_type}")
         
         # Create temp file with the original extension to preserve format information
-        original_ext = os.path.splitext(filename)[1] or ".mp3"
+        original_ext = Path(filename or "").suffix or ".mp3"
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=original_ext) as temp:
-            shutil.copyfileobj(file.file, temp)
-            temp_path = temp.name
+        temp_path = await save_upload_to_temp(file, original_ext)
         
         print(f"[DEBUG] Saved uploaded file to {temp_path} (size: {os.path.getsize(temp_path)} bytes)")
         
         # Try transcribing the audio
         try:
-            transcript = transcribe_audio(temp_path, keep_files=keep_debug_files)
+            transcript = await asyncio.to_thread(transcribe_audio, temp_path, keep_files=keep_debug_files)
             print(f"[DEBUG] Successfully transcribed: '{transcript}'")
             
             try:
@@ -718,29 +764,7 @@ async def voice_input(file: UploadFile = File(...), keep_debug_files: bool = Fal
                 nodes_to_call = state.get('nodes_to_call', [])
                 print(f"[DEBUG] Nodes to call: {nodes_to_call}")
                 
-                if 'flights' in nodes_to_call:
-                    print("[DEBUG] Processing with flights_node")
-                    state = await flights_node(state)
-                
-                if 'route' in nodes_to_call:
-                    print("[DEBUG] Processing with route_node")
-                    state = await route_node(state)
-                
-                if 'places' in nodes_to_call:
-                    print("[DEBUG] Processing with places_node")
-                    state = await places_node(state)
-                
-                if 'restaurants' in nodes_to_call:
-                    print("[DEBUG] Processing with restaurants_node")
-                    state = await restaurants_node(state)
-                
-                if 'hotel' in nodes_to_call:
-                    print("[DEBUG] Processing with hotel_node")
-                    state = await hotel_node(state)
-                
-                if 'budget' in nodes_to_call:
-                    print("[DEBUG] Processing with budget_node")
-                    state = await budget_node(state)
+                state = await run_agent_nodes(state, nodes_to_call)
                 
                 # Step 6: Reviews Node
                 print("[DEBUG] Processing with reviews_node")
@@ -824,7 +848,6 @@ async def voice_input(file: UploadFile = File(...), keep_debug_files: bool = Fal
                     }
             except Exception as planning_error:
                 print(f"[ERROR] Trip planning failed: {str(planning_error)}")
-                import traceback
                 traceback.print_exc()
                 return {
                     "success": False,
@@ -839,17 +862,18 @@ async def voice_input(file: UploadFile = File(...), keep_debug_files: bool = Fal
                 "response": "I'm having trouble understanding the audio. Could you please speak more clearly or try typing your message instead?",
                 "error": str(transcription_error)
             }
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[ERROR] Voice input processing error: {str(e)}")
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         # Clean up the temporary file if it still exists and we're not in debug mode
-        if temp_path and os.path.exists(temp_path) and not keep_debug_files:
-            os.remove(temp_path)
+        if temp_path and not keep_debug_files:
+            Path(temp_path).unlink(missing_ok=True)
             print(f"[DEBUG] Deleted temporary file: {temp_path}")
-        elif temp_path and os.path.exists(temp_path) and keep_debug_files:
+        elif temp_path:
             print(f"[DEBUG] Keeping temporary file for debugging: {temp_path}")
 
 @app.post("/save-audio")
@@ -867,8 +891,7 @@ async def save_audio(file: UploadFile = File(...), keep_debug_files: bool = Fals
         
         # Save the file directly
         with open(audio_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+            await save_upload(file, f)
             
         file_size = audio_path.stat().st_size
         print(f"[DEBUG] Saved audio file to {audio_path}, size: {file_size} bytes")
@@ -885,7 +908,7 @@ async def save_audio(file: UploadFile = File(...), keep_debug_files: bool = Fals
         transcript = None
         try:
             # Pass the keep_files parameter to control whether to delete files after processing
-            transcript = transcribe_audio(str(audio_path), keep_files=keep_debug_files)
+            transcript = await asyncio.to_thread(transcribe_audio, str(audio_path), keep_files=keep_debug_files)
             print(f"[DEBUG] Successfully transcribed: '{transcript}'")
             
             try:
@@ -943,29 +966,7 @@ async def save_audio(file: UploadFile = File(...), keep_debug_files: bool = Fals
                 nodes_to_call = state.get('nodes_to_call', [])
                 print(f"[DEBUG] Nodes to call: {nodes_to_call}")
                 
-                if 'flights' in nodes_to_call:
-                    print("[DEBUG] Processing with flights_node")
-                    state = await flights_node(state)
-                
-                if 'route' in nodes_to_call:
-                    print("[DEBUG] Processing with route_node")
-                    state = await route_node(state)
-                
-                if 'places' in nodes_to_call:
-                    print("[DEBUG] Processing with places_node")
-                    state = await places_node(state)
-                
-                if 'restaurants' in nodes_to_call:
-                    print("[DEBUG] Processing with restaurants_node")
-                    state = await restaurants_node(state)
-                
-                if 'hotel' in nodes_to_call:
-                    print("[DEBUG] Processing with hotel_node")
-                    state = await hotel_node(state)
-                
-                if 'budget' in nodes_to_call:
-                    print("[DEBUG] Processing with budget_node")
-                    state = await budget_node(state)
+                state = await run_agent_nodes(state, nodes_to_call)
                 
                 # Step 6: Reviews Node
                 print("[DEBUG] Processing with reviews_node")
@@ -1049,7 +1050,6 @@ async def save_audio(file: UploadFile = File(...), keep_debug_files: bool = Fals
                     }
             except Exception as planning_error:
                 print(f"[ERROR] Trip planning failed: {str(planning_error)}")
-                import traceback
                 traceback.print_exc()
                 return {
                     "success": False,
@@ -1068,9 +1068,13 @@ async def save_audio(file: UploadFile = File(...), keep_debug_files: bool = Fals
                 "file_path": str(audio_path)
             }
             
+    except HTTPException:
+        # Drop the partial upload
+        audio_path.unlink(missing_ok=True)
+        raise
+        
     except Exception as e:
         print(f"[ERROR] Audio processing error: {str(e)}")
-        import traceback
         traceback.print_exc()
         return {
             "success": False,
@@ -1085,7 +1089,7 @@ async def continue_processing(request: ChatRequest):
     This is used in step-by-step mode to allow the frontend to fetch the final itinerary.
     """
     try:
-        print(f"[DEBUG] Continue processing request: {request.dict()}")
+        print(f"[DEBUG] Continue processing request: {request.model_dump()}")
         
         # Ensure we have a valid conversation ID
         if not request.conversation_id:
@@ -1135,7 +1139,6 @@ async def continue_processing(request: ChatRequest):
         
     except Exception as e:
         print(f"[ERROR] Error in continue_processing: {str(e)}")
-        import traceback
         traceback.print_exc()
         return InteractionResponse(
             conversation_id=request.conversation_id,
@@ -1224,10 +1227,36 @@ async def broadcast_update(conversation_id: str, update_type: str, data: Dict[st
         for dead in dead_connections:
             connections.discard(dead)
 
+# Plans being computed, by response cache key; identical queries arriving
+# meanwhile wait for the same run instead of starting their own
+plans_in_flight: Dict[str, asyncio.Task] = {}
+
+async def plan_query(query: str) -> Dict[str, Any]:
+    """Run a query through the shared planner and cache a finished plan."""
+    # Initialize state
+    state = {
+        "query": query,
+        "raw_query": query,
+        "is_valid": False,
+        "metadata": None,
+        "next_question": None,
+        "error": None
+    }
+    
+    # Process query with the shared planner
+    result = await trip_planner.process(state)
+    
+    if result.get("final_itinerary") and not result.get("error"):
+        await state_store.cache_plan(query, result)
+    return result
+
 async def process_travel_query(query: str) -> dict:
     """
     Process a travel query through the validation and planning pipeline.
     
+    Identical queries are served from the response cache while it holds
+    a finished plan for them.
+    
     Args:
         query: User's travel query
         
@@ -1235,23 +1264,20 @@ async def process_travel_query(query: str) -> dict:
         dict: Results containing trip details or error message
     """
     try:
-        # Initialize state
-        state = {
-            "query": query,
-            "raw_query": query,
-            "is_valid": False,
-            "metadata": None,
-            "next_question": None,
-            "error": None
-        }
+        cached_state = await state_store.get_cached_plan(query)
+        if cached_state is not None:
+            logger.info("Serving cached travel plan")
+            return cached_state
         
-        # Create graph instance
-        graph = TripPlannerGraph()
-        
-        # Process query
-        result = await graph.process(state)
-        
-        return result
+        key = state_store.response_cache_key(query)
+        task = plans_in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(plan_query(query))
+            plans_in_flight[key] = task
+            task.add_done_callback(lambda _: plans_in_flight.pop(key, None))
+        # Every caller gets its own copy, since callers keep and modify it;
+        # shielded so one caller going away does not cancel the others' run
+        return copy.deepcopy(await asyncio.shield(task))
         
     except Exception as e:
         logger.error(f"Error processing query: {str(e)}")
@@ -1271,7 +1297,7 @@ async def main():
     
     while True:
         # Get user input
-        query = input("\nEnter your travel query (or 'exit' to quit): ")
+        query = await asyncio.to_thread(input, "\nEnter your travel query (or 'exit' to quit): ")
         
         if query.lower() in ['exit', 'quit', 'q']:
             print("\nThank you for using TripIntelAI. Have a great trip! 👋")
@@ -1306,7 +1332,7 @@ async def main():
             print("Please try again with a different query.")
         
         # Ask if user wants to plan another trip
-        another = input("\nWould you like to plan another trip? (y/n): ")
+        another = await asyncio.to_thread(input, "\nWould you like to plan another trip? (y/n): ")
         if another.lower() not in ['y', 'yes']:
             print("\nThank you for using TripIntelAI. Have a great trip! 👋")
             break
@@ -2,12 +2,13 @@ from typing import Dict, Any, List, Optional, TypedDict
 from datetime import datetime, timedelta
 import random
 import os
-import requests
+from app.utils.http_client import get_http_session
 import googlemaps
 from anthropic import Anthropic
 from app.schemas.trip_schema import (
     Flight, Hotel, Place, Restaurant, Budget, TripMetadata
 )
+from app import state_store
 
 import json
 from pydantic import BaseModel
@@ -59,7 +60,7 @@ class AmadeusFlightSearch:
             "client_id": self.api_key,
             "client_secret": self.api_secret
         }
-        response = requests.post(url, data=data)
+        response = get_http_session().post(url, data=data)
         if response.status_code != 200:
             raise Exception(f"Failed to get access token: {response.text}")
         return response.json()["access_token"]
@@ -74,7 +75,7 @@ class AmadeusFlightSearch:
         params = {"keyword": city_name, "subType": "CITY"}
         headers = {"Authorization": f"Bearer {self.access_token}"}
 
-        res = requests.get(url, headers=headers, params=params)
+        res = get_http_session().get(url, headers=headers, params=params)
         if res.status_code == 429:
             print("Rate limited: Too many location requests. Try again later.")
             return ""
@@ -119,7 +120,7 @@ class AmadeusFlightSearch:
             params["returnDate"] = return_date
 
         try:
-            response = requests.get(url, headers=headers, params=params)
+            response = get_http_session().get(url, headers=headers, params=params)
             if response.status_code == 429:
                 raise Exception("Rate limited: Too many flight searches. Try again later.")
             response.raise_for_status()
@@ -190,6 +191,18 @@ def geocode_location(location_name, gmaps=None):
         print(f"Error geocoding location {location_name}: {e}")
         return None, None
 
+# Geocode through the cache shared by all workers
+async def geocode_location_cached(location_name, gmaps=None):
+    """Geocode a location, reusing results cached in the shared state store"""
+    cached, = await state_store.get_cached_lookups("geocode", [location_name])
+    if cached:
+        return tuple(cached)
+    
+    lat, lng = await asyncio.to_thread(geocode_location, location_name, gmaps)
+    if lat is not None and lng is not None:
+        await state_store.cache_lookups("geocode", {location_name: [lat, lng]})
+    return lat, lng
+
 # Get attractions in a city
 def get_city_attractions(city_lat, city_lng, city_name="the city", radius=25000, attractions_keywords=None, sort_by="reviews"):
     """
@@ -243,7 +256,7 @@ def get_city_attractions(city_lat, city_lng, city_name="the city", radius=25000,
                 keyword_params["type"] = place_type
                 keyword_params["keyword"] = keyword
                 
-                response = requests.get(url, params=keyword_params)
+                response = get_http_session().get(url, params=keyword_params)
                 result_data = response.json()
                 
                 if result_data.get('status') == "OK" and result_data.get('results'):
@@ -255,7 +268,7 @@ def get_city_attractions(city_lat, city_lng, city_name="the city", radius=25000,
             type_params = base_params.copy()
             type_params["type"] = place_type
             
-            response = requests.get(url, params=type_params)
+            response = get_http_session().get(url, params=type_params)
             result_data = response.json()
             
             if result_data.get('status') == "OK" and result_data.get('results'):
@@ -688,7 +701,7 @@ def _find_hotels(latitude, longitude, keyword="lodging", radius=5000):
         params["keyword"] = keyword
     
     try:
-        response = requests.get(url, params=params)
+        response = get_http_session().get(url, params=params)
         data = response.json()
         
         if data.get('status') != 'OK':
@@ -735,7 +748,7 @@ def _get_restaurants(latitude, longitude, radius=1000, meal_type="dinner", min_p
         params["keyword"] = keyword
     
     try:
-        response = requests.get(url, params=params)
+        response = get_http_session().get(url, params=params)
         data = response.json()
         
         if data.get('status') != 'OK':
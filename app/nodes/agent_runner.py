@@ -0,0 +1,92 @@
+from typing import Any, Dict, Iterable, get_args
+import asyncio
+from app.nodes.agents.flights_node import flights_node
+from app.nodes.agents.route_node import route_node
+from app.nodes.agents.places_node import fetch_attractions, fetch_restaurants
+from app.nodes.agents.hotel_node import hotel_node
+from app.nodes.agents.budget_node import budget_node
+from app.nodes.planner_node import NodeType
+from app.utils.logger import logger
+
+# Agent nodes selectable by the planner
+NODE_REGISTRY = {
+    "flights": flights_node,
+    "route": route_node,
+    "places": fetch_attractions,
+    "restaurants": fetch_restaurants,
+    "hotel": hotel_node,
+    "budget": budget_node,
+}
+
+# Agents with no data dependency on each other; they run concurrently
+INDEPENDENT_NODES = frozenset({"flights", "places", "restaurants", "hotel"})
+
+# Agents that read other agents' results, run one at a time in this order
+# once the independent ones are done: route uses places, and budget uses
+# flights, hotel, places and route
+DEPENDENT_NODES = ("route", "budget")
+
+def _check_registry() -> None:
+    """Fail at import if a node the planner can select has no agent or no stage."""
+    selectable = set(get_args(NodeType))
+    unregistered = selectable - NODE_REGISTRY.keys()
+    if unregistered:
+        raise RuntimeError(f"No agent registered for nodes: {', '.join(sorted(unregistered))}")
+    unstaged = selectable - INDEPENDENT_NODES - set(DEPENDENT_NODES)
+    if unstaged:
+        raise RuntimeError(f"No stage assigned to nodes: {', '.join(sorted(unstaged))}")
+    for name, node in NODE_REGISTRY.items():
+        if not callable(node):
+            raise RuntimeError(f"Agent registered for {name} is not callable")
+
+_check_registry()
+
+async def run_node(node, state):
+    """Run a pipeline node, keeping synchronous nodes off the event loop"""
+    if asyncio.iscoroutinefunction(node):
+        return await node(state)
+    return await asyncio.to_thread(node, state)
+
+async def run_nodes_concurrently(state, node_names):
+    """
+    Run independent agent nodes at the same time and merge their results.
+
+    Each node gets its own shallow copy of the state; keys a node added or
+    replaced are merged back. A failing node is logged and skipped so the
+    other results are kept.
+    """
+    if not node_names:
+        return state
+
+    logger.info(f"Processing nodes concurrently: {node_names}")
+    for name in node_names:
+        logger.debug(f"Processing with {name}_node")
+    results = await asyncio.gather(
+        *[run_node(NODE_REGISTRY[name], dict(state)) for name in node_names],
+        return_exceptions=True
+    )
+
+    merged = dict(state)
+    for name, result in zip(node_names, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error in {name}_node: {str(result)}")
+            continue
+        merged.update({
+            key: value for key, value in result.items()
+            if key not in state or state[key] is not value
+        })
+    return merged
+
+async def run_agent_nodes(state: Dict[str, Any], node_names: Iterable[str]) -> Dict[str, Any]:
+    """
+    Run the selected agent nodes: the independent ones together, then each
+    dependent one in order, so that it sees the results it builds on.
+    """
+    selected = frozenset(node_names)
+    state = await run_nodes_concurrently(
+        state, [n for n in NODE_REGISTRY if n in selected and n in INDEPENDENT_NODES]
+    )
+    for name in DEPENDENT_NODES:
+        if name in selected:
+            state = await run_nodes_concurrently(state, [name])
+    return state
@@ -2,6 +2,7 @@ from typing import Dict, Any, List, Optional, TypedDict
 from datetime import datetime
 from app.schemas.trip_schema import TripMetadata, Budget
 import json
+import asyncio
 from langchain_anthropic import ChatAnthropic
 import logging
 
@@ -106,49 +107,36 @@ async def search_real_prices(location: str, category: str, preferences: List[str
             "details": f"Using default values due to error: {str(e)}"
         }
 
-async def get_real_hotel_prices(state: Dict[str, Any], metadata: TripMetadata) -> float:
-    """Get real hotel prices based on location and preferences"""
-    hotel_data = await search_real_prices(
-        location=metadata.destination,
-        category="hotel",
-        preferences=metadata.preferences
-    )
-    
+def nightly_hotel_price(hotel_data: Dict[str, Any]) -> float:
+    """Nightly hotel price from a hotel price search"""
     # Use the average price, or calculate based on min/max if no average
     if hotel_data["average_price"] > 0:
         return hotel_data["average_price"]
     return (hotel_data["min_price"] + hotel_data["max_price"]) / 2
 
-async def get_real_food_prices(state: Dict[str, Any], metadata: TripMetadata) -> float:
-    """Get real food costs based on location and preferences"""
-    food_data = await search_real_prices(
-        location=metadata.destination,
-        category="food",
-        preferences=metadata.preferences
-    )
-    
+def daily_food_price(food_data: Dict[str, Any]) -> float:
+    """Daily food cost per person from a food price search"""
     # Multiply by 3 for three meals a day
-    daily_food_cost = food_data["average_price"] * 3
-    return daily_food_cost
+    return food_data["average_price"] * 3
 
 async def get_real_activity_prices(state: Dict[str, Any], metadata: TripMetadata) -> float:
     """Get real activity prices based on selected places"""
-    total_activity_cost = 0
     places = state.get("places", [])
+    place_names = [
+        place.get("name", "") for place in places if isinstance(place, dict)
+    ]
     
-    # Search for prices for each place
-    for place in places:
-        if isinstance(place, dict):
-            place_name = place.get("name", "")
-            if place_name:
-                activity_data = await search_real_prices(
-                    location=f"{place_name} in {metadata.destination}",
-                    category="activities",
-                    preferences=metadata.preferences
-                )
-                total_activity_cost += activity_data["average_price"]
+    # Search for prices for every place at once
+    activity_data = await asyncio.gather(*[
+        search_real_prices(
+            location=f"{place_name} in {metadata.destination}",
+            category="activities",
+            preferences=metadata.preferences
+        )
+        for place_name in place_names if place_name
+    ])
     
-    return total_activity_cost
+    return sum(data["average_price"] for data in activity_data)
 
 async def budget_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -177,16 +165,24 @@ async def budget_node(state: Dict[str, Any]) -> Dict[str, Any]:
             cheapest_flight = min(flights, key=lambda x: x.get("price", float("inf")))
             flights_total = cheapest_flight.get("price", 0) * metadata.num_people
         
+        # Search hotel, food and activity prices at the same time; the
+        # destination-wide searches also fill in budget_details below
+        hotel_data, food_data, activities_data, activities_estimate = await asyncio.gather(
+            search_real_prices(metadata.destination, "hotel", metadata.preferences),
+            search_real_prices(metadata.destination, "food", metadata.preferences),
+            search_real_prices(metadata.destination, "activities", metadata.preferences),
+            get_real_activity_prices(state, metadata)
+        )
+        
         # Get real hotel prices
-        hotel_per_night = await get_real_hotel_prices(state, metadata)
+        hotel_per_night = nightly_hotel_price(hotel_data)
         hotel_total = hotel_per_night * duration
         
         # Get real food costs
-        daily_food_cost = await get_real_food_prices(state, metadata)
+        daily_food_cost = daily_food_price(food_data)
         daily_food_estimate = daily_food_cost * metadata.num_people
         
         # Get real activity costs
-        activities_estimate = await get_real_activity_prices(state, metadata)
         activities_estimate *= metadata.num_people
         
         # Calculate transportation costs if using route
@@ -228,14 +224,14 @@ async def budget_node(state: Dict[str, Any]) -> Dict[str, Any]:
         )
         
         # Add to state
-        state["budget"] = budget.dict()
+        state["budget"] = budget.model_dump()
         
         # Add detailed price information for reference
         state["budget_details"] = {
             "price_searches": {
-                "hotel": await search_real_prices(metadata.destination, "hotel", metadata.preferences),
-                "food": await search_real_prices(metadata.destination, "food", metadata.preferences),
-                "activities": await search_real_prices(metadata.destination, "activities", metadata.preferences)
+                "hotel": hotel_data,
+                "food": food_data,
+                "activities": activities_data
             },
             "calculations": {
                 "per_night_hotel": hotel_per_night,
@@ -2,7 +2,7 @@ from typing import Dict, Any, List, Optional, TypedDict
 from datetime import datetime, timedelta
 import random
 import os
-import requests
+from app.utils.http_client import get_http_session
 import googlemaps
 from app.schemas.trip_schema import (
     Flight, Hotel, Place, Restaurant, Budget, TripMetadata
@@ -125,7 +125,7 @@ def get_places(latitude, longitude, radius=25000, place_type=None, keyword=None)
         params["keyword"] = keyword
     
     try:
-        response = requests.get(url, params=params)
+        response = get_http_session().get(url, params=params)
         data = response.json()
         
         if data.get('status') != 'OK':
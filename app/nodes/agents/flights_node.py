@@ -3,6 +3,7 @@ import random
 from datetime import datetime, timedelta
 import os
 import httpx
+from app.utils.http_client import get_http_client
 from pydantic import BaseModel
 from app.schemas.trip_schema import Flight, TripMetadata
 from app.nodes.agents.common import GraphState, generate_mock_datetime
@@ -93,41 +94,41 @@ Please ensure all fields are included and properly formatted."""
         }
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:  # Added timeout
-                logger.info(f"Sending request to Perplexity API: {data}")
-                response = await client.post(
-                    self.base_url,
-                    json=data,
-                    headers=headers,
-                    timeout=30.0  # Added timeout
-                )
-                logger.info(f"Perplexity API response status: {response.status_code}")
-                logger.info(f"Perplexity API response: {response.text}")
+            client = get_http_client()
+            logger.info(f"Sending request to Perplexity API: {data}")
+            response = await client.post(
+                self.base_url,
+                json=data,
+                headers=headers,
+                timeout=30.0  # Added timeout
+            )
+            logger.info(f"Perplexity API response status: {response.status_code}")
+            logger.info(f"Perplexity API response: {response.text}")
                 
-                if response.status_code != 200:
-                    logger.error(f"Perplexity API error: Status {response.status_code}, Response: {response.text}")
-                    logger.info("Falling back to mock data due to API error")
-                    return self._generate_mock_flights_from_response("")
+            if response.status_code != 200:
+                logger.error(f"Perplexity API error: Status {response.status_code}, Response: {response.text}")
+                logger.info("Falling back to mock data due to API error")
+                return self._generate_mock_flights_from_response("")
                 
-                # Parse the response to extract flight information
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
+            # Parse the response to extract flight information
+            result = response.json()
+            content = result["choices"][0]["message"]["content"]
                 
-                # Extract JSON array from the response content
-                try:
-                    # Find the JSON array in the response
-                    json_start = content.find("[")
-                    json_end = content.rfind("]") + 1
-                    if json_start >= 0 and json_end > json_start:
-                        json_str = content[json_start:json_end]
-                        flights_data = json.loads(json_str)
-                        return flights_data
-                    else:
-                        logger.warning("No JSON array found in response content")
-                        return self._generate_mock_flights_from_response("")
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse JSON from response content: {e}")
+            # Extract JSON array from the response content
+            try:
+                # Find the JSON array in the response
+                json_start = content.find("[")
+                json_end = content.rfind("]") + 1
+                if json_start >= 0 and json_end > json_start:
+                    json_str = content[json_start:json_end]
+                    flights_data = json.loads(json_str)
+                    return flights_data
+                else:
+                    logger.warning("No JSON array found in response content")
                     return self._generate_mock_flights_from_response("")
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to parse JSON from response content: {e}")
+                return self._generate_mock_flights_from_response("")
                 
         except httpx.HTTPError as e:
             logger.error(f"HTTP error occurred while calling Perplexity API: {str(e)}")
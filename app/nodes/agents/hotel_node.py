@@ -1,11 +1,12 @@
 from typing import Dict, Any
+import asyncio
 import os
 import random
 from datetime import datetime, timedelta
 from app.schemas.trip_schema import Hotel, TripMetadata
 from app.nodes.agent_nodes import (
     get_gmaps_client,
-    geocode_location,
+    geocode_location_cached,
     _find_hotels,
     _select_best_hotel,
     _get_default_amenities,
@@ -22,13 +23,13 @@ async def hotel_node(state: Dict[str, Any]) -> Dict[str, Any]:
         
         # Get destination coordinates
         gmaps = get_gmaps_client()
-        lat, lng = geocode_location(metadata.destination, gmaps)
+        lat, lng = await geocode_location_cached(metadata.destination, gmaps)
         
         if not lat or not lng:
             raise ValueError(f"Could not geocode location: {metadata.destination}")
         
         # Search for hotels
-        hotels = _find_hotels(lat, lng)
+        hotels = await asyncio.to_thread(_find_hotels, lat, lng)
         
         if not hotels:
             # Fallback to mock data if no hotels found
@@ -42,7 +43,11 @@ async def hotel_node(state: Dict[str, Any]) -> Dict[str, Any]:
             return await _fallback_hotel_to_mock(state, metadata)
         
         # Get hotel details
-        hotel_details = gmaps.place(best_hotel["place_id"], fields=["name", "rating", "formatted_address", "price_level"])
+        hotel_details = await asyncio.to_thread(
+            gmaps.place,
+            best_hotel["place_id"],
+            fields=["name", "rating", "formatted_address", "price_level"]
+        )
         
         # Create hotel object
         hotel = Hotel(
@@ -58,7 +63,7 @@ async def hotel_node(state: Dict[str, Any]) -> Dict[str, Any]:
         )
         
         # Add to state
-        state["hotel"] = hotel.dict()
+        state["hotel"] = hotel.model_dump()
         
         return state
         
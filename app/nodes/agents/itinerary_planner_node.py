@@ -8,6 +8,7 @@ import asyncio
 
 # Third-party imports
 import httpx
+from app.utils.http_client import get_http_client
 from langchain_anthropic import ChatAnthropic
 
 # Local imports
@@ -85,6 +86,43 @@ IMPORTANT:
 6. Return ONLY the JSON object, with no additional text or explanation.
 """
 
+# Flight fields the daily planner needs; anything else the search returned
+# is left out of the prompt
+FLIGHT_FIELDS = (
+    "id", "flight_type", "airline", "flight_number",
+    "departure_airport", "departure_city", "arrival_airport", "arrival_city",
+    "departure_time", "arrival_time", "price", "duration_minutes",
+    "stops", "aircraft", "cabin_class", "baggage_included"
+)
+
+_EMPTY_FLIGHT = dict.fromkeys(FLIGHT_FIELDS)
+
+def flight_details(flight: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Project a flight onto FLIGHT_FIELDS, with every field None if there is no flight."""
+    if not flight:
+        return dict(_EMPTY_FLIGHT)
+    return {field: flight.get(field) for field in FLIGHT_FIELDS}
+
+def trip_flights(flights: List[Dict[str, Any]]) -> Any:
+    """
+    Pick the flights the plan is built around.
+    
+    Returns the first arrival and first departure flight, stopping the scan
+    as soon as both are found. Flights without a flight_type (e.g. mock
+    results) are all returned, as the planner cannot tell them apart.
+    """
+    by_type: Dict[Optional[str], Dict[str, Any]] = {}
+    for flight in flights:
+        by_type.setdefault(flight.get("flight_type"), flight)
+        if "arrival" in by_type and "departure" in by_type:
+            break
+    if "arrival" not in by_type and "departure" not in by_type:
+        return [flight_details(flight) for flight in flights]
+    return {
+        "arrival": flight_details(by_type.get("arrival")),
+        "departure": flight_details(by_type.get("departure"))
+    }
+
 class GraphState(TypedDict):
     """State for the LangGraph pipeline."""
     current_day: int
@@ -183,79 +221,79 @@ IMPORTANT:
         
         for attempt in range(self.max_retries):
             try:
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.post(
-                        self.base_url,
-                        json=data,
-                        headers=headers,
-                        timeout=30.0
-                    )
+                client = get_http_client()
+                response = await client.post(
+                    self.base_url,
+                    json=data,
+                    headers=headers,
+                    timeout=30.0
+                )
                     
-                    if response.status_code != 200:
-                        logger.error(f"Perplexity API error (attempt {attempt + 1}/{self.max_retries}): Status {response.status_code}, Response: {response.text}")
-                        if attempt < self.max_retries - 1:
-                            await asyncio.sleep(self.retry_delay)
-                            continue
-                        return {}
+                if response.status_code != 200:
+                    logger.error(f"Perplexity API error (attempt {attempt + 1}/{self.max_retries}): Status {response.status_code}, Response: {response.text}")
+                    if attempt < self.max_retries - 1:
+                        await asyncio.sleep(self.retry_delay)
+                        continue
+                    return {}
                     
-                    result = response.json()
-                    if not result.get("choices") or not result["choices"][0].get("message", {}).get("content"):
-                        logger.error(f"Invalid response format (attempt {attempt + 1}/{self.max_retries})")
-                        if attempt < self.max_retries - 1:
-                            await asyncio.sleep(self.retry_delay)
-                            continue
-                        return {}
+                result = response.json()
+                if not result.get("choices") or not result["choices"][0].get("message", {}).get("content"):
+                    logger.error(f"Invalid response format (attempt {attempt + 1}/{self.max_retries})")
+                    if attempt < self.max_retries - 1:
+                        await asyncio.sleep(self.retry_delay)
+                        continue
+                    return {}
                         
-                    content = result["choices"][0]["message"]["content"]
-                    logger.info(f"Received response for {activity_title}: {content}")
+                content = result["choices"][0]["message"]["content"]
+                logger.info(f"Received response for {activity_title}: {content}")
                     
-                    try:
-                        json_start = content.find('{')
-                        json_end = content.rfind('}') + 1
-                        if json_start >= 0 and json_end > json_start:
-                            json_str = content[json_start:json_end]
-                            parsed_data = json.loads(json_str)
+                try:
+                    json_start = content.find('{')
+                    json_end = content.rfind('}') + 1
+                    if json_start >= 0 and json_end > json_start:
+                        json_str = content[json_start:json_end]
+                        parsed_data = json.loads(json_str)
                             
-                            # Validate the structure
-                            if not isinstance(parsed_data, dict):
-                                logger.error("Invalid JSON structure: not a dictionary")
-                                if attempt < self.max_retries - 1:
-                                    await asyncio.sleep(self.retry_delay)
-                                    continue
-                                return {}
+                        # Validate the structure
+                        if not isinstance(parsed_data, dict):
+                            logger.error("Invalid JSON structure: not a dictionary")
+                            if attempt < self.max_retries - 1:
+                                await asyncio.sleep(self.retry_delay)
+                                continue
+                            return {}
                                 
-                            if not all(key in parsed_data for key in ["details", "review_insights"]):
-                                logger.error("Missing required fields in response")
-                                if attempt < self.max_retries - 1:
-                                    await asyncio.sleep(self.retry_delay)
-                                    continue
-                                return {}
+                        if not all(key in parsed_data for key in ["details", "review_insights"]):
+                            logger.error("Missing required fields in response")
+                            if attempt < self.max_retries - 1:
+                                await asyncio.sleep(self.retry_delay)
+                                continue
+                            return {}
                                 
-                            # Validate details
-                            details = parsed_data.get("details", {})
-                            if not self._validate_details(details, location):
-                                logger.error("Invalid details data")
-                                if attempt < self.max_retries - 1:
-                                    await asyncio.sleep(self.retry_delay)
-                                    continue
-                                return {}
+                        # Validate details
+                        details = parsed_data.get("details", {})
+                        if not self._validate_details(details, location):
+                            logger.error("Invalid details data")
+                            if attempt < self.max_retries - 1:
+                                await asyncio.sleep(self.retry_delay)
+                                continue
+                            return {}
                                 
-                            # Validate review insights
-                            review_insights = parsed_data.get("review_insights", {})
-                            if not self._validate_review_insights(review_insights):
-                                logger.error("Invalid review insights data")
-                                if attempt < self.max_retries - 1:
-                                    await asyncio.sleep(self.retry_delay)
-                                    continue
-                                return {}
+                        # Validate review insights
+                        review_insights = parsed_data.get("review_insights", {})
+                        if not self._validate_review_insights(review_insights):
+                            logger.error("Invalid review insights data")
+                            if attempt < self.max_retries - 1:
+                                await asyncio.sleep(self.retry_delay)
+                                continue
+                            return {}
                                 
-                            return parsed_data
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Failed to parse JSON from response: {e}")
-                        if attempt < self.max_retries - 1:
-                            await asyncio.sleep(self.retry_delay)
-                            continue
-                        return {}
+                        return parsed_data
+                except json.JSONDecodeError as e:
+                    logger.error(f"Failed to parse JSON from response: {e}")
+                    if attempt < self.max_retries - 1:
+                        await asyncio.sleep(self.retry_delay)
+                        continue
+                    return {}
                     
             except httpx.HTTPError as e:
                 logger.error(f"HTTP error occurred (attempt {attempt + 1}/{self.max_retries}): {str(e)}")
@@ -445,6 +483,46 @@ def clean_json_string(json_str: str) -> str:
     
     return json_str
 
+def new_final_itinerary(state: GraphState) -> Dict[str, Any]:
+    """
+    Create the trip-level itinerary structure, with no days filled in yet.
+    
+    Args:
+        state: State holding the trip's destination, dates, duration and hotel
+        
+    Returns:
+        The final itinerary with its trip summary and empty review highlights
+    """
+    # Calculate end date from start date and duration
+    start_date = datetime.strptime(state.get('start_date', ''), '%Y-%m-%d')
+    end_date = start_date + timedelta(days=state.get('total_days', 1) - 1)
+    
+    return {
+        'trip_summary': {
+            'destination': state.get('destination', 'Unknown'),
+            'start_date': state.get('start_date', ''),
+            'end_date': end_date.strftime('%Y-%m-%d'),  # Set the calculated end date
+            'duration_days': state.get('total_days', 1),
+            'total_budget': 0
+        },
+        'daily_itinerary': {},
+        'review_highlights': {
+            'top_rated_places': [],
+            'top_rated_restaurants': [],
+            'hotel_review_summary': {
+                'name': state.get('hotel', {}).get('name', ''),
+                'rating': state.get('hotel', {}).get('rating', 0),
+                'strengths': [],
+                'weaknesses': [],
+                'summary': ''
+            },
+            'overall': [],
+            'accommodations': [],
+            'dining': [],
+            'attractions': []
+        }
+    }
+
 async def itinerary_planner_node(state: GraphState) -> GraphState:
     """
     Create a daily itinerary based on available options and constraints.
@@ -464,15 +542,20 @@ async def itinerary_planner_node(state: GraphState) -> GraphState:
         start_date = datetime.strptime(state.get('start_date', ''), '%Y-%m-%d')
         current_day_date = (start_date + timedelta(days=state.get('current_day', 1) - 1)).strftime('%Y-%m-%d')
         
+        # Visited names are kept as sets for constant-time lookups; a state
+        # restored from storage holds them as lists, so convert those once
+        visited_places = state['visited_places'] = set(state.get('visited_places') or ())
+        visited_restaurants = state['visited_restaurants'] = set(state.get('visited_restaurants') or ())
+        
         # Filter out already visited places and restaurants
         available_places = [
             place for place in state.get('places', [])
-            if place.get('name') not in state.get('visited_places', set())
+            if place.get('name') not in visited_places
         ]
         
         available_restaurants = [
             restaurant for restaurant in state.get('restaurants', [])
-            if restaurant.get('name') not in state.get('visited_restaurants', set())
+            if restaurant.get('name') not in visited_restaurants
         ]
         
         # Format the prompt
@@ -482,13 +565,13 @@ async def itinerary_planner_node(state: GraphState) -> GraphState:
             destination=state.get('destination', 'Unknown'),
             start_date=state.get('start_date', ''),
             current_day_date=current_day_date,
-            flights=state.get('flights', []),
+            flights=trip_flights(state.get('flights', [])),
             hotel=state.get('hotel', {}),
             budget=state.get('budget', {}),
             available_places=available_places,
             available_restaurants=available_restaurants,
-            visited_places=list(state.get('visited_places', set())),
-            visited_restaurants=list(state.get('visited_restaurants', set())),
+            visited_places=list(visited_places),
+            visited_restaurants=list(visited_restaurants),
             previous_days=previous_days
         )
         
@@ -561,9 +644,9 @@ async def itinerary_planner_node(state: GraphState) -> GraphState:
         # Update visited places and restaurants from activities
         for activity in daily_itinerary.get('activities', []):
             if activity.get('type') == 'attraction':
-                state['visited_places'].add(activity.get('title', ''))
+                visited_places.add(activity.get('title', ''))
             elif activity.get('type') == 'dining':
-                state['visited_restaurants'].add(activity.get('title', ''))
+                visited_restaurants.add(activity.get('title', ''))
         
         # Format the date properly
         day_num = state.get('current_day', 1)
@@ -585,35 +668,7 @@ async def itinerary_planner_node(state: GraphState) -> GraphState:
         # Update final itinerary
         if not state.get('final_itinerary'):
             logger.info("Creating new final itinerary structure")
-            # Calculate end date from start date and duration
-            start_date = datetime.strptime(state.get('start_date', ''), '%Y-%m-%d')
-            end_date = start_date + timedelta(days=state.get('total_days', 1) - 1)
-            
-            state['final_itinerary'] = {
-                'trip_summary': {
-                    'destination': state.get('destination', 'Unknown'),
-                    'start_date': state.get('start_date', ''),
-                    'end_date': end_date.strftime('%Y-%m-%d'),  # Set the calculated end date
-                    'duration_days': state.get('total_days', 1),
-                    'total_budget': 0
-                },
-                'daily_itinerary': {},
-                'review_highlights': {
-                    'top_rated_places': [],
-                    'top_rated_restaurants': [],
-                    'hotel_review_summary': {
-                        'name': state.get('hotel', {}).get('name', ''),
-                        'rating': state.get('hotel', {}).get('rating', 0),
-                        'strengths': [],
-                        'weaknesses': [],
-                        'summary': ''
-                    },
-                    'overall': [],
-                    'accommodations': [],
-                    'dining': [],
-                    'attractions': []
-                }
-            }
+            state['final_itinerary'] = new_final_itinerary(state)
         
         # Add this day's itinerary to final itinerary with populated details
         state['final_itinerary']['daily_itinerary'][f'day_{day_num}'] = updated_daily_itinerary
@@ -631,4 +686,86 @@ async def itinerary_planner_node(state: GraphState) -> GraphState:
     except Exception as e:
         state['error'] = f"Failed to create daily itinerary: {str(e)}"
         logger.error(f"Failed to create daily itinerary: {str(e)}")
-        return state 
\ No newline at end of file
+        return state
+
+
+def deal_out(items: List[Dict[str, Any]], total_days: int) -> List[List[Dict[str, Any]]]:
+    """
+    Split candidates between days round-robin, keeping each share in rank order.
+    
+    Each candidate is claimed by exactly one day, so no two days are offered
+    the same one. When there are fewer candidates than days, the last days
+    get an empty share.
+    """
+    return [items[day::total_days] for day in range(total_days)]
+
+
+async def plan_all_days(state: GraphState) -> GraphState:
+    """
+    Plan every day of the trip concurrently.
+    
+    Days are planned independently, so the places and restaurants are
+    dealt out round-robin beforehand and each day only sees its own share;
+    this keeps days from repeating an attraction without them having to
+    wait on each other. When there are fewer candidates than days, the
+    days without a share are planned with nothing new to visit rather
+    than being given one another's. The days' itineraries are then merged in order
+    under a trip summary built once for the whole trip.
+    
+    If any day fails the step fails with it: the error names the failed
+    days and no final itinerary is produced, rather than one silently
+    missing those days.
+    
+    Args:
+        state: Current state containing all necessary information
+        
+    Returns:
+        Updated state with every daily itinerary and the final itinerary
+    """
+    total_days = max(state.get('total_days', 1), 1)
+    # Places visited earlier in the session are off the table for every day
+    visited_places = set(state.get('visited_places') or ())
+    visited_restaurants = set(state.get('visited_restaurants') or ())
+    place_shares = deal_out(state.get('places', []), total_days)
+    restaurant_shares = deal_out(state.get('restaurants', []), total_days)
+    
+    day_states = [
+        {
+            **state,
+            'current_day': day,
+            'places': place_shares[day - 1],
+            'restaurants': restaurant_shares[day - 1],
+            'daily_itineraries': [],
+            'visited_places': set(visited_places),
+            'visited_restaurants': set(visited_restaurants),
+            'final_itinerary': None,
+            'error': None
+        }
+        for day in range(1, total_days + 1)
+    ]
+    results = await asyncio.gather(*[itinerary_planner_node(day_state) for day_state in day_states])
+    
+    failures = {day: result['error'] for day, result in enumerate(results, start=1) if result.get('error')}
+    if failures:
+        for day, error in failures.items():
+            logger.error(f"Failed to plan day {day}: {error}")
+        state['error'] = "Failed to plan day(s) " + "; ".join(
+            f"{day}: {error}" for day, error in failures.items()
+        )
+        state['final_itinerary'] = None
+        return state
+    
+    daily_itineraries = []
+    final_itinerary = new_final_itinerary(state)
+    for result in results:
+        daily_itineraries.extend(result['daily_itineraries'])
+        visited_places |= result['visited_places']
+        visited_restaurants |= result['visited_restaurants']
+        final_itinerary['daily_itinerary'].update(result['final_itinerary']['daily_itinerary'])
+    
+    state['daily_itineraries'] = daily_itineraries
+    state['final_itinerary'] = final_itinerary
+    state['visited_places'] = visited_places
+    state['visited_restaurants'] = visited_restaurants
+    state['current_day'] = total_days + 1
+    return state
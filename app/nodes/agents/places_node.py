@@ -1,9 +1,10 @@
 from typing import Dict, Any, List
+import asyncio
 import os
 import googlemaps
 from app.utils.logger import logger
 from app.schemas.trip_schema import TripMetadata
-from app.nodes.agent_nodes import get_city_attractions, _get_restaurants, geocode_location
+from app.nodes.agent_nodes import get_city_attractions, _get_restaurants, geocode_location_cached
 
 async def fetch_attractions(state: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -36,12 +37,13 @@ async def fetch_attractions(state: Dict[str, Any]) -> Dict[str, Any]:
         gmaps = googlemaps.Client(key=api_key)
         
         # Geocode destination to get latitude and longitude
-        city_lat, city_lng = geocode_location(destination, gmaps)
+        city_lat, city_lng = await geocode_location_cached(destination, gmaps)
         if city_lat is None or city_lng is None:
             raise ValueError("Failed to geocode destination")
         
         # Get attractions using helper function
-        attractions = get_city_attractions(city_lat, city_lng, destination)
+        # Blocking Places API calls; run them off the event loop
+        attractions = await asyncio.to_thread(get_city_attractions, city_lat, city_lng, destination)
         
         # Update state with attractions
         state["places"] = attractions
@@ -84,12 +86,13 @@ async def fetch_restaurants(state: Dict[str, Any]) -> Dict[str, Any]:
         gmaps = googlemaps.Client(key=api_key)
         
         # Geocode destination to get latitude and longitude
-        city_lat, city_lng = geocode_location(destination, gmaps)
+        city_lat, city_lng = await geocode_location_cached(destination, gmaps)
         if city_lat is None or city_lng is None:
             raise ValueError("Failed to geocode destination")
         
         # Get restaurants using helper function
-        restaurants = _get_restaurants(city_lat, city_lng)
+        # Blocking Places API calls; run them off the event loop
+        restaurants = await asyncio.to_thread(_get_restaurants, city_lat, city_lng)
         
         # Update state with restaurants
         state["restaurants"] = restaurants
@@ -1,7 +1,7 @@
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 import os
-import requests
+from app.utils.http_client import get_http_session
 import googlemaps
 from anthropic import Anthropic
 import json
@@ -121,7 +121,7 @@ def get_opening_hours(place_id: str) -> Dict[str, Any]:
             "key": api_key
         }
         
-        response = requests.get(url, params=params)
+        response = get_http_session().get(url, params=params)
         data = response.json()
         
         if data.get('status') == 'OK' and 'result' in data:
@@ -376,6 +376,8 @@ async def generate_complete_itinerary(
         
         # Generate daily itineraries
         daily_itineraries = []
+        # Kept up as days are added rather than summed again at the end
+        estimated_total_cost = 0
         current_date = trip_metadata.get('start_date')
         end_date = trip_metadata.get('end_date')
         
@@ -389,6 +391,7 @@ async def generate_complete_itinerary(
             
             if daily_itinerary:
                 daily_itineraries.append(daily_itinerary)
+                estimated_total_cost += daily_itinerary.get('estimated_cost') or 0
                 
             current_date += timedelta(days=1)
         
@@ -400,7 +403,7 @@ async def generate_complete_itinerary(
                 "end_date": trip_metadata.get('end_date').strftime("%Y-%m-%d"),
                 "total_days": len(daily_itineraries),
                 "preferences": preferences,
-                "estimated_total_cost": sum(day.get('estimated_cost', 0) for day in daily_itineraries)
+                "estimated_total_cost": estimated_total_cost
             },
             "daily_itineraries": daily_itineraries,
             "recommendations": generate_trip_recommendations(daily_itineraries, preferences)
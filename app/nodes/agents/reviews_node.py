@@ -1,4 +1,5 @@
 from typing import Dict, Any, List
+import asyncio
 import os
 import googlemaps
 from app.utils.logger import logger
@@ -43,7 +44,8 @@ async def reviews_node(state: Dict[str, Any]) -> Dict[str, Any]:
                     
                 try:
                     # Get place details including reviews, opening hours, and rating
-                    place_details = gmaps.place(
+                    place_details = await asyncio.to_thread(
+                        gmaps.place,
                         place_id,
                         fields=[
                             "reviews",
@@ -90,7 +92,8 @@ async def reviews_node(state: Dict[str, Any]) -> Dict[str, Any]:
                     
                 try:
                     # Get restaurant details including reviews, opening hours, and rating
-                    restaurant_details = gmaps.place(
+                    restaurant_details = await asyncio.to_thread(
+                        gmaps.place,
                         place_id,
                         fields=[
                             "reviews",
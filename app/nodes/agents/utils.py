@@ -1,5 +1,5 @@
 import os
-import requests
+from app.utils.http_client import get_http_session
 import googlemaps
 import random
 from app.schemas.trip_schema import Hotel, TripMetadata
@@ -62,7 +62,7 @@ def get_city_attractions(city_lat, city_lng, city_name="the city", radius=25000,
                 keyword_params = base_params.copy()
                 keyword_params["type"] = place_type
                 keyword_params["keyword"] = keyword
-                response = requests.get(url, params=keyword_params)
+                response = get_http_session().get(url, params=keyword_params)
                 result_data = response.json()
                 if result_data.get('status') == "OK" and result_data.get('results'):
                     print(f"Found {len(result_data.get('results'))} results for '{place_type}' with keyword '{keyword}'")
@@ -71,7 +71,7 @@ def get_city_attractions(city_lat, city_lng, city_name="the city", radius=25000,
         for place_type in place_types:
             type_params = base_params.copy()
             type_params["type"] = place_type
-            response = requests.get(url, params=type_params)
+            response = get_http_session().get(url, params=type_params)
             result_data = response.json()
             if result_data.get('status') == "OK" and result_data.get('results'):
                 print(f"Found {len(result_data.get('results'))} results for '{place_type}'")
@@ -105,7 +105,7 @@ def _get_restaurants(latitude, longitude, radius=1000, meal_type="dinner", min_p
     if keyword:
         params["keyword"] = keyword
     try:
-        response = requests.get(url, params=params)
+        response = get_http_session().get(url, params=params)
         data = response.json()
         if data.get('status') != 'OK':
             print(f"Error fetching restaurants: {data.get('status')}")
@@ -135,7 +135,7 @@ def _find_hotels(latitude, longitude, keyword="lodging", radius=5000):
     if keyword and keyword != "lodging":
         params["keyword"] = keyword
     try:
-        response = requests.get(url, params=params)
+        response = get_http_session().get(url, params=params)
         data = response.json()
         if data.get('status') != 'OK':
             print(f"Error fetching hotels: {data.get('status')}")
@@ -225,5 +225,5 @@ async def _fallback_hotel_to_mock(state: dict, metadata: dict) -> dict:
         amenities=["WiFi", "Breakfast", "Gym", "Pool"],
         place_id="ChIJN1t_tStoiERuMIXG2aLFIY0"
     )
-    state["hotel"] = hotel.dict()
+    state["hotel"] = hotel.model_dump()
     return state 
\ No newline at end of file
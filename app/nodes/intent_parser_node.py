@@ -1,14 +1,14 @@
 from typing import Dict, Any, List, TypedDict, Optional
 from datetime import datetime
 from app.schemas.trip_schema import TripMetadata
+from app import state_store
 import json
+import os
 import re
 import logging
 from app.utils.gemini_client import get_gemini_response
 from app.utils.logger import logger
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 INTENT_PARSER_PROMPT = '''You are a travel intent parser. Extract structured travel intent from the user's query that may contain typos or natural language variations.
@@ -51,6 +51,10 @@ Example response:
 {{"source":null,"destination":"New York City","start_date":null,"end_date":null,"num_people":null,"preferences":[]}}
 '''
 
+# Parsed intents are reused for identical queries (ignoring case and spacing).
+# Kept for a day only, since relative dates like "next month" move.
+INTENT_CACHE_TTL = int(os.getenv("INTENT_CACHE_TTL", "86400"))
+
 class GraphState(TypedDict):
     """State for the LangGraph pipeline."""
     raw_query: str
@@ -134,26 +138,31 @@ async def intent_parser_node(state: Dict[str, Any]) -> Dict[str, Any]:
             
         logger.info(f"Processing user query: '{state}'")
         
-        # Format the prompt
-        prompt = INTENT_PARSER_PROMPT.format(query=query)
-        logger.info("Calling Gemini API")
-        response_text = await get_gemini_response(
-            prompt,
-            model="gemini-2.0-flash",
-            max_tokens=500
-        )
-        
-        if not response_text:
-            raise ValueError("Empty response from Gemini")
+        [intent_data] = await state_store.get_cached_lookups("intent", [query])
+        cached = intent_data is not None
+        if cached:
+            logger.info("Using cached intent data")
+        else:
+            # Format the prompt
+            prompt = INTENT_PARSER_PROMPT.format(query=query)
+            logger.info("Calling Gemini API")
+            response_text = await get_gemini_response(
+                prompt,
+                model="gemini-2.0-flash",
+                max_tokens=500
+            )
             
-        logger.info(f"Received raw response from Gemini: {response_text[:100]}...")
-        
-        # Parse the JSON response
-        intent_data = extract_json_from_llm_response(response_text)
-        if not intent_data:
-            raise ValueError("No JSON object found in response")
+            if not response_text:
+                raise ValueError("Empty response from Gemini")
+                
+            logger.info(f"Received raw response from Gemini: {response_text[:100]}...")
             
-        logger.info(f"Successfully parsed intent data: {intent_data}")
+            # Parse the JSON response
+            intent_data = extract_json_from_llm_response(response_text)
+            if not intent_data:
+                raise ValueError("No JSON object found in response")
+                
+            logger.info(f"Successfully parsed intent data: {intent_data}")
         
         # Ensure preferences is a list
         if intent_data.get("preferences") is None:
@@ -163,6 +172,10 @@ async def intent_parser_node(state: Dict[str, Any]) -> Dict[str, Any]:
         logger.info("Creating TripMetadata instance")
         metadata = TripMetadata(**intent_data)
         
+        # Only intents that produced valid metadata are reused
+        if not cached:
+            await state_store.cache_lookups("intent", {query: intent_data}, ttl=INTENT_CACHE_TTL)
+        
         # Update state with metadata
         return {
             **state,
@@ -1,5 +1,6 @@
 import os
 import requests
+from app.utils.http_client import get_http_session
 from typing import Dict, List, Optional, Any
 from dotenv import load_dotenv
 from langchain_anthropic import ChatAnthropic
@@ -130,7 +131,7 @@ class LocationCoordinates:
             }
             
             print(f"Making API request for: {query}")
-            response = requests.get(self.base_url, params=params)
+            response = get_http_session().get(self.base_url, params=params)
             response.raise_for_status()
             
             data = response.json()
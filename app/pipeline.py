@@ -6,17 +6,16 @@ from dotenv import load_dotenv
 import logging
 import json
 
-# Configure logging
-logging.basicConfig(level=logging.INFO,
-                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Logging is configured by app.utils.logger and the entry points
 logger = logging.getLogger(__name__)
 
 # Import the individual components
 from app.nodes.chat_input_node import chat_input_node
 from app.nodes.intent_parser_node import intent_parser_node
 from app.nodes.trip_validator_node import trip_validator_node
-from app.nodes.planner_node import planner_node
-from app.nodes.agent_nodes import flights_node, route_node, places_node, restaurants_node, hotel_node, budget_node, reviews_node
+from app.nodes.planner_node import agent_selector_node as planner_node
+from app.nodes.agents import flights_node, route_node, hotel_node, budget_node, reviews_node
+from app.nodes.agents.places_node import fetch_attractions as places_node, fetch_restaurants as restaurants_node
 from app.nodes.flight_selection_node import display_flight_options, get_user_flight_selection
 from app.nodes.summary_node import summary_node
 from app.nodes.feedback_parser_node import feedback_parser_node
@@ -0,0 +1,452 @@
+"""
+Shared state storage for the travel planning API.
+
+Conversation states and job records used to live in module-level dicts, which
+tied the API to a single uvicorn worker. They now go through a small backend
+interface: ``InMemoryBackend`` keeps the old single-process behaviour for
+development, ``RedisBackend`` lets several workers/pods share the same state.
+
+Select the backend with the ``STATE_BACKEND`` environment variable
+(``memory`` or ``redis``) and point Redis at ``REDIS_URL``.
+"""
+
+import copy
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Protocol
+
+import orjson
+
+from app.schemas.trip_schema import TripMetadata
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import RedisError
+except ImportError:  # redis is optional for local development
+    aioredis = None
+    RedisError = OSError
+
+logger = logging.getLogger(__name__)
+
+# Key layout
+JOB_PREFIX = "job:"
+BOOKING_PREFIX = "bookingstatus:"
+CONVERSATION_PREFIX = "conv:"
+RESPONSE_PREFIX = "travelresp:"
+LOOKUP_PREFIX = "lookup:"
+AGENT_PREFIX = "agent:"
+
+# Conversations are kept for a day after their last update
+CONVERSATION_TTL = int(os.getenv("CONVERSATION_TTL", "86400"))
+
+# Job records are dropped an hour after their last update
+JOB_TTL = int(os.getenv("JOB_TTL", "3600"))
+
+# Booking records are kept for a day so clients can look up the outcome
+BOOKING_TTL = int(os.getenv("BOOKING_TTL", "86400"))
+
+# Upper bound on keys held by the in-memory backend, and how often it
+# sweeps out expired entries
+MEMORY_MAX_ENTRIES = int(os.getenv("STATE_MAX_ENTRIES", "60000"))
+MEMORY_SWEEP_INTERVAL = 60
+
+# Completed plans are reused for identical queries for an hour
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+
+# External lookups (geocodes and the like) change rarely; keep them a week
+LOOKUP_CACHE_TTL = int(os.getenv("LOOKUP_CACHE_TTL", "604800"))
+
+# Agent results (flight offers, hotels, places) go stale faster; keep them an hour
+AGENT_CACHE_TTL = int(os.getenv("AGENT_CACHE_TTL", "3600"))
+
+# Per-request flags that must not leak into a reused plan
+_UNCACHED_KEYS = ("session_id", "step_by_step", "awaiting_flight_selection", "selected_flights", "error", "_version", "_summary", "_summary_frame")
+
+
+class StateBackend(Protocol):
+    """Minimal key/value interface used by the API layer."""
+
+    async def get(self, key: str) -> Optional[Any]: ...
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]: ...
+
+    async def mset(self, mapping: Dict[str, Any], ttl: Optional[int] = None) -> None: ...
+
+    async def incr(self, key: str, amount: int = 1) -> int: ...
+
+    async def hgetall(self, key: str) -> Dict[str, Any]: ...
+
+    async def hset(self, key: str, mapping: Dict[str, Any], ttl: Optional[int] = None) -> None: ...
+
+    async def scan(self, prefix: str) -> List[str]: ...
+
+
+def _json_default(obj: Any) -> Any:
+    """Serialize the non-JSON values that show up in pipeline state."""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> str:
+    """Encode a value for storage in Redis."""
+    # orjson handles datetimes natively; non-str keys are stringified like stdlib json
+    return orjson.dumps(value, default=_json_default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def loads(raw: Any) -> Any:
+    """Decode a value read back from Redis."""
+    if raw is None:
+        return None
+    return orjson.loads(raw)
+
+
+def _restore_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild model objects that the nodes expect to find in state."""
+    metadata = state.get("metadata")
+    if isinstance(metadata, dict):
+        state["metadata"] = TripMetadata(**metadata)
+    return state
+
+
+class InMemoryBackend:
+    """
+    Process-local backend. Values are stored by reference.
+
+    Keys expire after their TTL like they would in Redis, and at most
+    ``max_entries`` keys are kept, evicting the least recently used first.
+    """
+
+    def __init__(self, max_entries: int = MEMORY_MAX_ENTRIES):
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._expires: Dict[str, float] = {}
+        self._max_entries = max_entries
+        self._last_sweep = time.monotonic()
+
+    def _live(self, key: str) -> bool:
+        """Whether the key exists, dropping it first if it has expired."""
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._data.pop(key, None)
+            del self._expires[key]
+            return False
+        return key in self._data
+
+    def _touch(self, key: str, ttl: Optional[int]) -> None:
+        """Mark a key as recently written and enforce the size bound."""
+        self._data.move_to_end(key)
+        if ttl:
+            self._expires[key] = time.monotonic() + ttl
+
+        now = time.monotonic()
+        if now - self._last_sweep >= MEMORY_SWEEP_INTERVAL:
+            self._last_sweep = now
+            for expired in [k for k, expires in self._expires.items() if expires <= now]:
+                self._data.pop(expired, None)
+                del self._expires[expired]
+
+        while len(self._data) > self._max_entries:
+            evicted, _ = self._data.popitem(last=False)
+            self._expires.pop(evicted, None)
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not self._live(key):
+            return None
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self._data[key] = value
+        # A plain SET clears any previous expiry, as in Redis
+        if not ttl:
+            self._expires.pop(key, None)
+        self._touch(key, ttl)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+        self._expires.pop(key, None)
+
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        return [await self.get(key) for key in keys]
+
+    async def mset(self, mapping: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        for key, value in mapping.items():
+            await self.set(key, value, ttl)
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        current = self._data[key] if self._live(key) else 0
+        value = int(current) + amount
+        self._data[key] = value
+        self._touch(key, None)
+        return value
+
+    async def hgetall(self, key: str) -> Dict[str, Any]:
+        if not self._live(key):
+            return {}
+        self._data.move_to_end(key)
+        return dict(self._data[key])
+
+    async def hset(self, key: str, mapping: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        if not self._live(key):
+            self._data[key] = {}
+        self._data[key].update(mapping)
+        self._touch(key, ttl)
+
+    async def scan(self, prefix: str) -> List[str]:
+        return [key for key in list(self._data) if key.startswith(prefix) and self._live(key)]
+
+
+class RedisBackend:
+    """
+    Redis-backed store shared by all workers.
+
+    Values are JSON encoded; hashes store one JSON value per field so that
+    numbers and ``None`` survive the round trip. If Redis becomes unreachable
+    the backend logs the failure and serves from a process-local fallback.
+    """
+
+    def __init__(self, url: str, max_connections: int = 50):
+        pool = aioredis.ConnectionPool.from_url(url, max_connections=max_connections, decode_responses=True)
+        self._redis = aioredis.Redis(connection_pool=pool)
+        self._fallback = InMemoryBackend()
+
+    def _degraded(self, op: str, key: str, error: Exception) -> None:
+        logger.warning(f"Redis {op} failed for {key}, using in-memory fallback: {error}")
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            return loads(await self._redis.get(key))
+        except (RedisError, OSError) as e:
+            self._degraded("GET", key, e)
+            return await self._fallback.get(key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        try:
+            await self._redis.set(key, dumps(value), ex=ttl)
+        except (RedisError, OSError) as e:
+            self._degraded("SET", key, e)
+            await self._fallback.set(key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        try:
+            await self._redis.delete(key)
+        except (RedisError, OSError) as e:
+            self._degraded("DEL", key, e)
+        await self._fallback.delete(key)
+
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        if not keys:
+            return []
+        try:
+            return [loads(raw) for raw in await self._redis.mget(keys)]
+        except (RedisError, OSError) as e:
+            self._degraded("MGET", keys[0], e)
+            return await self._fallback.mget(keys)
+
+    async def mset(self, mapping: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        if not mapping:
+            return
+        try:
+            # One round trip for all keys; MSET itself cannot set an expiry
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key, value in mapping.items():
+                    pipe.set(key, dumps(value), ex=ttl)
+                await pipe.execute()
+        except (RedisError, OSError) as e:
+            self._degraded("MSET", next(iter(mapping)), e)
+            await self._fallback.mset(mapping, ttl)
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        try:
+            return await self._redis.incrby(key, amount)
+        except (RedisError, OSError) as e:
+            self._degraded("INCR", key, e)
+            return await self._fallback.incr(key, amount)
+
+    async def hgetall(self, key: str) -> Dict[str, Any]:
+        try:
+            raw = await self._redis.hgetall(key)
+            return {field: loads(value) for field, value in raw.items()}
+        except (RedisError, OSError) as e:
+            self._degraded("HGETALL", key, e)
+            return await self._fallback.hgetall(key)
+
+    async def hset(self, key: str, mapping: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        try:
+            # Write the fields and refresh the expiry in a single round trip
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.hset(key, mapping={field: dumps(value) for field, value in mapping.items()})
+                if ttl:
+                    pipe.expire(key, ttl)
+                await pipe.execute()
+        except (RedisError, OSError) as e:
+            self._degraded("HSET", key, e)
+            await self._fallback.hset(key, mapping, ttl)
+
+    async def scan(self, prefix: str) -> List[str]:
+        try:
+            return [key async for key in self._redis.scan_iter(match=prefix + "*", count=500)]
+        except (RedisError, OSError) as e:
+            self._degraded("SCAN", prefix, e)
+            return await self._fallback.scan(prefix)
+
+
+def create_backend() -> StateBackend:
+    """Create the backend selected by the environment."""
+    backend = os.getenv("STATE_BACKEND", "memory").lower()
+    if backend == "redis":
+        if aioredis is None:
+            logger.warning("STATE_BACKEND=redis but the redis package is not installed; using in-memory state")
+            return InMemoryBackend()
+        url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        logger.info("Using Redis state backend")
+        return RedisBackend(url, max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "50")))
+    return InMemoryBackend()
+
+
+backend: StateBackend = create_backend()
+
+
+def get_redis_client():
+    """Return the Redis client behind the active backend, or None."""
+    if isinstance(backend, RedisBackend):
+        return backend._redis
+    return None
+
+#-------------------------------------------------------
+# Jobs
+#-------------------------------------------------------
+
+async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Return the job record, or None if the job is unknown."""
+    job = await backend.hgetall(JOB_PREFIX + job_id)
+    return job or None
+
+
+async def update_job(job_id: str, **fields: Any) -> None:
+    """Create or update fields on a job record."""
+    await backend.hset(JOB_PREFIX + job_id, fields, ttl=JOB_TTL)
+
+#-------------------------------------------------------
+# Flight bookings
+#-------------------------------------------------------
+
+# Bookings are stored as their rendered status response, so the status
+# endpoint is a single GET passed straight through to the client.
+
+async def get_booking(booking_id: str) -> Optional[str]:
+    """Return the booking's status response as JSON, or None if the booking is unknown."""
+    return await backend.get(BOOKING_PREFIX + booking_id)
+
+
+async def save_booking(booking_id: str, payload: str) -> None:
+    """Store the booking's status response, rendered as JSON."""
+    await backend.set(BOOKING_PREFIX + booking_id, payload, ttl=BOOKING_TTL)
+
+#-------------------------------------------------------
+# Conversations
+#-------------------------------------------------------
+
+async def get_conversation(conversation_id: str) -> Optional[Dict[str, Any]]:
+    """Return the stored state for a conversation, or None."""
+    state = await backend.get(CONVERSATION_PREFIX + conversation_id)
+    if state is None:
+        return None
+    return _restore_state(state)
+
+
+async def save_conversation(conversation_id: str, state: Dict[str, Any]) -> None:
+    """Persist the state for a conversation."""
+    await backend.set(CONVERSATION_PREFIX + conversation_id, state, ttl=CONVERSATION_TTL)
+
+
+async def delete_conversation(conversation_id: str) -> None:
+    """Remove a conversation's state."""
+    await backend.delete(CONVERSATION_PREFIX + conversation_id)
+
+
+async def list_conversations() -> List[str]:
+    """Return the IDs of all stored conversations."""
+    keys = await backend.scan(CONVERSATION_PREFIX)
+    return [key[len(CONVERSATION_PREFIX):] for key in keys]
+
+#-------------------------------------------------------
+# Response cache
+#-------------------------------------------------------
+
+def normalize_query(query: str) -> str:
+    """Lowercase a query and collapse its whitespace."""
+    return " ".join(query.lower().split())
+
+
+def response_cache_key(query: str) -> str:
+    """Build the cache key for a travel query."""
+    digest = hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+    return RESPONSE_PREFIX + digest[:32]
+
+
+async def get_cached_plan(query: str) -> Optional[Dict[str, Any]]:
+    """Return a completed planning state for an identical query, if cached."""
+    state = await backend.get(response_cache_key(query))
+    if state is None:
+        return None
+    # The in-memory backend hands out the stored object itself
+    return _restore_state(copy.deepcopy(state))
+
+
+async def cache_plan(query: str, state: Dict[str, Any]) -> None:
+    """Cache a completed planning state for later identical queries."""
+    cached = {key: value for key, value in state.items() if key not in _UNCACHED_KEYS}
+    await backend.set(response_cache_key(query), copy.deepcopy(cached), ttl=RESPONSE_CACHE_TTL)
+
+#-------------------------------------------------------
+# Lookup cache
+#-------------------------------------------------------
+
+def lookup_cache_key(namespace: str, text: str) -> str:
+    """Build the cache key for an external lookup of some text."""
+    digest = hashlib.sha256(normalize_query(text).encode("utf-8")).hexdigest()
+    return f"{LOOKUP_PREFIX}{namespace}:{digest[:16]}"
+
+
+async def get_cached_lookups(namespace: str, texts: List[str]) -> List[Optional[Any]]:
+    """Return cached lookup results for several texts in one round trip, None for misses."""
+    return await backend.mget([lookup_cache_key(namespace, text) for text in texts])
+
+
+async def cache_lookups(namespace: str, results: Dict[str, Any], ttl: int = LOOKUP_CACHE_TTL) -> None:
+    """Cache lookup results keyed by the text they were looked up for."""
+    await backend.mset(
+        {lookup_cache_key(namespace, text): value for text, value in results.items()},
+        ttl=ttl
+    )
+
+#-------------------------------------------------------
+# Agent result cache
+#-------------------------------------------------------
+
+def agent_cache_key(agent: str, inputs: Dict[str, Any]) -> str:
+    """Build the cache key for an agent run on the given inputs."""
+    digest = hashlib.sha256(dumps(inputs).encode("utf-8")).hexdigest()
+    return f"{AGENT_PREFIX}{agent}:{digest[:16]}"
+
+
+async def get_cached_agent_result(agent: str, inputs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Return the cached result of an agent run, or None on a miss."""
+    result = await backend.get(agent_cache_key(agent, inputs))
+    # The in-memory backend hands out the stored object itself
+    return copy.deepcopy(result)
+
+
+async def cache_agent_result(agent: str, inputs: Dict[str, Any], result: Dict[str, Any]) -> None:
+    """Cache the result of an agent run for later runs on the same inputs."""
+    await backend.set(agent_cache_key(agent, inputs), copy.deepcopy(result), ttl=AGENT_CACHE_TTL)
@@ -0,0 +1 @@
+"""Task queue workers for long-running jobs that should not run in the API process."""
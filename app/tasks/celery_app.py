@@ -0,0 +1,30 @@
+"""
+Celery application for work that outlives an API request.
+
+Start a worker next to the API with:
+
+    celery -A app.tasks.celery_app worker --concurrency=2
+
+The broker defaults to ``REDIS_URL``; set ``CELERY_BROKER_URL`` to use a
+different one.
+"""
+
+import os
+
+from celery import Celery
+
+celery_app = Celery(
+    "tripintel",
+    broker=os.getenv("CELERY_BROKER_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0")),
+    include=["app.tasks.flight"],
+)
+
+celery_app.conf.update(
+    # Bookings take minutes; hand them out one at a time and only
+    # acknowledge them once finished so a crashed worker's job is retried
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    task_serializer="json",
+    accept_content=["json"],
+)
@@ -0,0 +1,18 @@
+"""Celery tasks for flight booking."""
+
+import asyncio
+from typing import Any, Dict
+
+from app.tasks.celery_app import celery_app
+
+# Each worker process keeps one event loop so that pooled Redis connections
+# stay usable from one task to the next
+_loop = asyncio.new_event_loop()
+
+@celery_app.task(name="flights.run_booking")
+def run_booking(request_data: Dict[str, Any], booking_id: str) -> None:
+    """Run a flight booking in the worker and record its outcome."""
+    # Imported here because the API module enqueues this task
+    from app.api.flight_booking import BookingRequest, book_flight_task
+
+    _loop.run_until_complete(book_flight_task(BookingRequest(**request_data), booking_id))
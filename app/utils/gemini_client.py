@@ -1,6 +1,5 @@
 from google.generativeai import GenerativeModel, configure
 import google.api_core.exceptions
-import time
 import os
 from dotenv import load_dotenv
 from app.utils.logger import logger
@@ -56,8 +55,8 @@ async def get_gemini_response(
             # Initialize the model
             model = GenerativeModel(model)
             
-            # Generate response
-            response = model.generate_content(prompt)
+            # Generate response in a worker thread; the SDK call is blocking
+            response = await asyncio.to_thread(model.generate_content, prompt)
             
             # Extract the text from the response
             return response.text
@@ -71,7 +70,7 @@ async def get_gemini_response(
                 # Exponential backoff
                 wait_time = (2 ** attempt) * 1
                 print(f"Rate limited. Waiting {wait_time} seconds before retry...")
-                time.sleep(wait_time)
+                await asyncio.sleep(wait_time)
                 continue
                 
             # If it's the last attempt, raise the error
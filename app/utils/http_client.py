@@ -0,0 +1,73 @@
+import asyncio
+from typing import Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Connection limits shared by every outbound API call in the process
+MAX_CONNECTIONS = 200
+MAX_KEEPALIVE_CONNECTIONS = 100
+DEFAULT_TIMEOUT = 30.0
+
+_async_client: Optional[httpx.AsyncClient] = None
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_session: Optional[requests.Session] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared async HTTP client.
+
+    The client keeps connections (and their TLS sessions) alive between
+    calls, so agents should use it instead of opening their own
+    httpx.AsyncClient per request. It is recreated if it was closed or
+    belongs to a different event loop.
+
+    Returns:
+        httpx.AsyncClient: Pooled client for the running event loop
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.is_closed or _async_client_loop is not loop:
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS
+            ),
+            timeout=DEFAULT_TIMEOUT,
+            http2=HTTP2_AVAILABLE
+        )
+        _async_client_loop = loop
+    return _async_client
+
+def get_http_session() -> requests.Session:
+    """
+    Get the shared requests session for synchronous API helpers.
+
+    Returns:
+        requests.Session: Session with a pooled connection adapter
+    """
+    global _session
+    if _session is None:
+        adapter = HTTPAdapter(pool_connections=MAX_KEEPALIVE_CONNECTIONS, pool_maxsize=MAX_KEEPALIVE_CONNECTIONS)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _session = session
+    return _session
+
+async def close_http_clients() -> None:
+    """Close the shared clients, e.g. on application shutdown."""
+    global _async_client, _session
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _session is not None:
+        _session.close()
+        _session = None
@@ -0,0 +1,42 @@
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+from fastapi import HTTPException, UploadFile
+
+# Temporary uploads go to tmpfs where there is one, so that clips which are
+# only transcribed and deleted never reach the disk
+UPLOAD_TEMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+# Uploads are copied to disk in 1 MiB chunks, up to MAX_AUDIO_BYTES
+UPLOAD_CHUNK_SIZE = 1 << 20
+MAX_AUDIO_BYTES = int(os.getenv("MAX_AUDIO_BYTES", str(25 * 1024 * 1024)))
+
+async def save_upload(file: UploadFile, dest) -> int:
+    """
+    Copy an upload into an open file in chunks, returning the bytes written.
+
+    Raises a 413 HTTPException as soon as the upload exceeds MAX_AUDIO_BYTES.
+    """
+    total = 0
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        total += len(chunk)
+        if total > MAX_AUDIO_BYTES:
+            raise HTTPException(status_code=413, detail="Audio too large")
+        await asyncio.to_thread(dest.write, chunk)
+    return total
+
+async def save_upload_to_temp(file: UploadFile, suffix: str) -> str:
+    """
+    Save an upload to a new temporary file in UPLOAD_TEMP_DIR and return its path.
+
+    If the upload fails, for instance with the 413 from save_upload, the
+    partial file is removed before the error propagates.
+    """
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=UPLOAD_TEMP_DIR) as temp:
+        try:
+            await save_upload(file, temp)
+        except BaseException:
+            Path(temp.name).unlink(missing_ok=True)
+            raise
+    return temp.name
@@ -1,5 +1,4 @@
 import os
-import requests
 import shutil
 import datetime
 from dotenv import load_dotenv
@@ -7,6 +6,8 @@ import time
 import subprocess
 import mimetypes
 
+from app.utils.http_client import get_http_session
+
 load_dotenv()
 
 # Initialize mimetypes
@@ -112,16 +113,17 @@ def transcribe_audio(file_path, keep_files=False):
     # Files to clean up after processing
     files_to_cleanup = []
     
-    # Save a copy of the file for debugging
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    debug_file_path = os.path.join(DEBUG_DIR, f'audio_{timestamp}.mp3')
     
-    try:
-        shutil.copy2(file_path, debug_file_path)
-        print(f"[DEBUG] Saved copy of audio file to {debug_file_path}")
-        files_to_cleanup.append(debug_file_path)
-    except Exception as e:
-        print(f"[WARNING] Could not save debug copy of audio: {e}")
+    # Save a copy of the file for debugging; without keep_files it would
+    # only be deleted again, so it is not made at all
+    if keep_files:
+        debug_file_path = os.path.join(DEBUG_DIR, f'audio_{timestamp}.mp3')
+        try:
+            shutil.copy2(file_path, debug_file_path)
+            print(f"[DEBUG] Saved copy of audio file to {debug_file_path}")
+        except Exception as e:
+            print(f"[WARNING] Could not save debug copy of audio: {e}")
     
     # Identify the actual file type
     file_type = identify_file_type(file_path)
@@ -154,7 +156,7 @@ def transcribe_audio(file_path, keep_files=False):
                 'model': 'nova',
                 'language': 'en'
             }
-            response = requests.post(
+            response = get_http_session().post(
                 base_url, 
                 headers=headers,
                 params=params,
@@ -186,7 +188,7 @@ def transcribe_audio(file_path, keep_files=False):
             
             with open(file_path, 'rb') as audio_file:
                 # Use data parameter directly for binary data
-                response = requests.post(
+                response = get_http_session().post(
                     base_url, 
                     headers=headers,
                     params=params,
@@ -216,7 +218,7 @@ def transcribe_audio(file_path, keep_files=False):
                     headers_with_type = headers.copy()
                     headers_with_type['Content-Type'] = 'audio/mpeg'
                     
-                    response = requests.post(
+                    response = get_http_session().post(
                         base_url, 
                         headers=headers_with_type,
                         params=params,
@@ -26,6 +26,9 @@ CORS(app, resources={
 # Store conversations
 conversations = {}
 
+# Shared by all requests; the compiled graph is reused between them
+trip_planner = TripPlannerGraph()
+
 # Helper functions
 def delay(ms):
     time.sleep(ms / 1000)
@@ -138,9 +141,6 @@ def chat():
         
         elif message_type == 'info':
             print("\n=== Processing info message ===")
-            # Create graph instance
-            graph = TripPlannerGraph()
-            
             # Initialize state with the user's message
             state = {
                 "query": message,
@@ -176,7 +176,7 @@ def chat():
             
             # Process the query
             print("\n=== Processing through graph ===")
-            result = asyncio.run(graph.process(state))
+            result = asyncio.run(trip_planner.process(state))
             
             print("\n=== Graph Result ===")
             print(f"Is Valid: {result.get('is_valid')}")
@@ -298,9 +298,6 @@ def chat():
             # Get the trip planner state
             trip_planner_state = conversations[conversation_id]['data'].get('trip_planner_state', {})
             
-            # Create graph instance
-            graph = TripPlannerGraph()
-            
             # Update state with selected flights
             state = {
                 **trip_planner_state,
@@ -308,7 +305,7 @@ def chat():
             }
             
             # Process the state to generate itinerary
-            result = asyncio.run(graph.process(state))
+            result = asyncio.run(trip_planner.process(state))
             
             # Store the result in conversation data
             conversations[conversation_id]['data']['trip_planner_state'] = result
@@ -332,9 +329,6 @@ def chat():
             })
         
         elif message_type == 'chat':
-            # Create graph instance
-            graph = TripPlannerGraph()
-            
             # Initialize state with the user's message
             state = {
                 "query": message,
@@ -357,7 +351,7 @@ def chat():
             }
             
             # Process the query
-            result = asyncio.run(graph.process(state))
+            result = asyncio.run(trip_planner.process(state))
             
             # Store the result in conversation data
             conversations[conversation_id]['data']['trip_planner_state'] = result
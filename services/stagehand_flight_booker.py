@@ -12,17 +12,23 @@ from playwright.async_api import async_playwright, Browser, Page, TimeoutError
 
 class VisibleFlightBooker:
     def __init__(self):
+        self.playwright = None
         self.browser = None
         self.page = None
         self.context = None
         
     async def initialize(self):
         """Initialize a visible browser instance."""
-        playwright = await async_playwright().start()
-        self.browser = await playwright.chromium.launch(
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(
             headless=False,  # This makes the browser visible
             slow_mo=1500  # Slow down actions by 1.5 seconds to make them more visible
         )
+        await self._new_context()
+        return {"status": "initialized"}
+
+    async def _new_context(self):
+        """Open a fresh browser context and page."""
         # Initialize context with no geolocation permissions
         self.context = await self.browser.new_context(
             viewport={'width': 1920, 'height': 1080},  # Full HD for better visibility
@@ -30,7 +36,16 @@ class VisibleFlightBooker:
             geolocation={'latitude': 0, 'longitude': 0}  # Set to null island
         )
         self.page = await self.context.new_page()
-        return {"status": "initialized"}
+
+    def is_healthy(self) -> bool:
+        """Whether the browser is still running and can take another booking."""
+        return self.browser is not None and self.browser.is_connected()
+
+    async def reset(self):
+        """Drop cookies and pages from the last booking, keeping the browser running."""
+        if self.context:
+            await self.context.close()
+        await self._new_context()
 
     async def _safe_type(self, text: str, delay: int = 100):
         """Type text with a delay between characters."""
@@ -49,7 +64,7 @@ class VisibleFlightBooker:
             try:
                 await self.page.click('button[aria-label*="Clear"]', timeout=2000)
                 return True
-            except:
+            except Exception:
                 # If no clear button, use keyboard shortcuts
                 if self.page.operating_system == "darwin":
                     await self.page.keyboard.press("Meta+A")  # Cmd+A on Mac
@@ -112,13 +127,13 @@ class VisibleFlightBooker:
             try:
                 # Try clicking the date directly
                 await self.page.click(f'text="{date_str}"')
-            except:
+            except Exception:
                 print("Exact date not found, trying alternative date selection...")
                 try:
                     # Try finding by aria-label
                     formatted_date = departure_date.strftime("%A, %B %-d")  # e.g., "Thursday, May 8"
                     await self.page.click(f'[aria-label*="{formatted_date}"]')
-                except:
+                except Exception:
                     print("Could not find exact date, please check the calendar manually")
             
             await asyncio.sleep(1)
@@ -199,6 +214,8 @@ class VisibleFlightBooker:
         """Clean up browser resources."""
         if self.browser:
             await self.browser.close()
+        if self.playwright:
+            await self.playwright.stop()
 
 # Example usage:
 async def example_visible_booking():
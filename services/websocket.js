@@ -17,6 +17,7 @@ class TripPlannerWebSocket {
     this.maxReconnectAttempts = 5;
     this.reconnectDelay = 1000; // Start with 1 second
     this.pingInterval = null;
+    this.stateVersion = null; // version of the last state_update received
   }
 
   /**
@@ -35,12 +36,17 @@ class TripPlannerWebSocket {
       this.disconnect();
     }
     
+    if (this.conversationId !== conversationId) {
+      this.stateVersion = null;
+    }
     this.conversationId = conversationId;
     
     return new Promise((resolve, reject) => {
       try {
-        // Create WebSocket connection
-        this.socket = new WebSocket(`${WS_URL}/ws/${conversationId}`);
+        // Create WebSocket connection; on reconnect, pass the version we
+        // already have so the server only resends the state if it changed
+        const query = this.stateVersion !== null ? `?version=${this.stateVersion}` : '';
+        this.socket = new WebSocket(`${WS_URL}/ws/${conversationId}${query}`);
         
         // Set up event handlers
         this.socket.onopen = () => {
@@ -60,10 +66,17 @@ class TripPlannerWebSocket {
         this.socket.onmessage = (event) => {
           try {
             const message = JSON.parse(event.data);
+            // Updates sent close together arrive as one batch frame
+            const messages = message.type === 'batch' ? message.events : [message];
             // Notify listeners, except for pong messages
-            if (message.type !== 'pong') {
-              this.messageListeners.forEach(listener => listener(message));
-            }
+            messages.forEach(msg => {
+              if (msg.type === 'state_update' && msg.data && msg.data.version !== undefined) {
+                this.stateVersion = msg.data.version;
+              }
+              if (msg.type !== 'pong') {
+                this.messageListeners.forEach(listener => listener(msg));
+              }
+            });
           } catch (error) {
             console.error('Error parsing WebSocket message:', error);
           }
@@ -151,10 +164,11 @@ class TripPlannerWebSocket {
     // Send a ping every 30 seconds
     this.pingInterval = setInterval(() => {
       if (this.isConnected) {
-        this.socket.send(JSON.stringify({ 
-          type: 'ping', 
-          timestamp: Date.now() 
-        }));
+        // The server answers this exact string without parsing it (see
+        // PING_MESSAGE in app/api.py), so send it byte for byte: no added
+        // whitespace, reordered or extra keys. Any other ping is parsed
+        // first and still answered, only more slowly.
+        this.socket.send('{"type":"ping"}');
       }
     }, 30000);
   }
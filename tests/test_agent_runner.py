@@ -0,0 +1,75 @@
+import asyncio
+from typing import get_args
+import pytest
+from app.nodes import agent_runner
+from app.nodes.planner_node import NodeType
+
+def stub_node(key, value):
+    """Agent stand-in that records its result under key"""
+    async def node(state):
+        state[key] = value
+        return state
+    return node
+
+@pytest.mark.asyncio
+async def test_selected_nodes_are_merged(monkeypatch):
+    """Test that every selected agent's result ends up in the state"""
+    monkeypatch.setattr(agent_runner, "NODE_REGISTRY", {
+        "flights": stub_node("flights", ["AF123"]),
+        "hotel": stub_node("hotel", {"name": "Hotel Lutetia"}),
+        "budget": stub_node("budget", {"total": 1200}),
+    })
+
+    state = await agent_runner.run_agent_nodes({"query": "Paris in May"}, ["flights", "hotel", "budget"])
+
+    assert state == {
+        "query": "Paris in May",
+        "flights": ["AF123"],
+        "hotel": {"name": "Hotel Lutetia"},
+        "budget": {"total": 1200}
+    }
+
+@pytest.mark.asyncio
+async def test_failing_node_keeps_other_results(monkeypatch):
+    """Test that one agent raising does not drop the others' results"""
+    async def failing_node(state):
+        raise RuntimeError("Places API unavailable")
+
+    monkeypatch.setattr(agent_runner, "NODE_REGISTRY", {
+        "places": failing_node,
+        "hotel": stub_node("hotel", {"name": "Hotel Lutetia"}),
+    })
+
+    state = await agent_runner.run_agent_nodes({}, ["places", "hotel"])
+
+    assert state == {"hotel": {"name": "Hotel Lutetia"}}
+
+def test_registry_covers_every_selectable_node():
+    """Test that each node the planner can select maps to an agent coroutine"""
+    selectable = set(get_args(NodeType))
+
+    assert set(agent_runner.NODE_REGISTRY) == selectable
+    assert selectable <= agent_runner.INDEPENDENT_NODES | set(agent_runner.DEPENDENT_NODES)
+    assert all(asyncio.iscoroutinefunction(node) for node in agent_runner.NODE_REGISTRY.values())
+
+@pytest.mark.asyncio
+async def test_dependent_nodes_see_earlier_results(monkeypatch):
+    """Test that route runs after places and budget after route"""
+    async def route_node(state):
+        state["route"] = {"stops": len(state["places"])}
+        return state
+
+    async def budget_node(state):
+        state["budget"] = {"route_stops": state["route"]["stops"]}
+        return state
+
+    monkeypatch.setattr(agent_runner, "NODE_REGISTRY", {
+        "places": stub_node("places", [{"name": "Louvre"}, {"name": "Eiffel Tower"}]),
+        "route": route_node,
+        "budget": budget_node,
+    })
+
+    state = await agent_runner.run_agent_nodes({}, ["budget", "route", "places"])
+
+    assert state["route"] == {"stops": 2}
+    assert state["budget"] == {"route_stops": 2}
@@ -0,0 +1,81 @@
+import pytest
+from app.nodes.agents import itinerary_planner_node as planner
+
+def trip_state(total_days):
+    return {
+        "total_days": total_days,
+        "destination": "Paris",
+        "start_date": "2024-05-15",
+        "hotel": {"name": "Hotel Lutetia", "rating": 4.6},
+        "places": [{"name": f"Place {i}"} for i in range(total_days)],
+        "restaurants": [{"name": f"Restaurant {i}"} for i in range(total_days)],
+        "visited_places": {"Notre-Dame"},
+        "visited_restaurants": set(),
+        "daily_itineraries": [],
+        "final_itinerary": None
+    }
+
+async def plan_day(state):
+    """Stand-in for the Gemini planner: visit the day's first place"""
+    day = state["current_day"]
+    place = state["places"][0]["name"]
+    itinerary = {"date": f"day {day}", "activities": [{"type": "attraction", "title": place}]}
+    state["daily_itineraries"].append(itinerary)
+    state["visited_places"].add(place)
+    # Each day builds its own trip summary, which the merge must not reuse
+    state["final_itinerary"] = {
+        "trip_summary": {"destination": "wrong"},
+        "daily_itinerary": {f"day_{day}": itinerary}
+    }
+    return state
+
+@pytest.mark.asyncio
+async def test_days_are_merged_in_order(monkeypatch):
+    """Test that every day lands in one final itinerary with a single trip summary"""
+    monkeypatch.setattr(planner, "itinerary_planner_node", plan_day)
+
+    state = await planner.plan_all_days(trip_state(3))
+
+    assert not state.get("error")
+    assert [day["date"] for day in state["daily_itineraries"]] == ["day 1", "day 2", "day 3"]
+    final = state["final_itinerary"]
+    assert list(final["daily_itinerary"]) == ["day_1", "day_2", "day_3"]
+    assert final["trip_summary"]["destination"] == "Paris"
+    assert final["trip_summary"]["end_date"] == "2024-05-17"
+    assert final["review_highlights"]["hotel_review_summary"]["name"] == "Hotel Lutetia"
+    assert state["visited_places"] == {"Notre-Dame", "Place 0", "Place 1", "Place 2"}
+    assert state["current_day"] == 4
+
+@pytest.mark.asyncio
+async def test_failed_day_fails_the_step(monkeypatch):
+    """Test that a failed day is reported and no partial itinerary is produced"""
+    async def plan_day_or_fail(state):
+        if state["current_day"] == 2:
+            state["error"] = "Failed to get response from Gemini"
+            return state
+        return await plan_day(state)
+
+    monkeypatch.setattr(planner, "itinerary_planner_node", plan_day_or_fail)
+
+    state = await planner.plan_all_days(trip_state(3))
+
+    assert state["error"] == "Failed to plan day(s) 2: Failed to get response from Gemini"
+    assert state["final_itinerary"] is None
+
+def test_deal_out_round_robin():
+    """Test that candidates are dealt round-robin, each claimed by one day"""
+    items = [{"name": name} for name in "abcdefg"]
+
+    shares = planner.deal_out(items, 3)
+
+    assert [[item["name"] for item in share] for share in shares] == [
+        ["a", "d", "g"], ["b", "e"], ["c", "f"]
+    ]
+
+def test_deal_out_fewer_candidates_than_days():
+    """Test that days left without a candidate get an empty share, not a repeat"""
+    items = [{"name": "a"}, {"name": "b"}]
+
+    shares = planner.deal_out(items, 4)
+
+    assert shares == [[items[0]], [items[1]], [], []]
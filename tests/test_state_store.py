@@ -0,0 +1,144 @@
+import pytest
+from app import state_store
+from app.state_store import InMemoryBackend
+from app.schemas.trip_schema import TripMetadata
+
+@pytest.fixture(autouse=True)
+def memory_backend(monkeypatch):
+    """Run every test against a fresh in-memory backend"""
+    monkeypatch.setattr(state_store, "backend", InMemoryBackend())
+
+@pytest.mark.asyncio
+async def test_job_fields_are_merged():
+    """Test that job updates merge into the existing record"""
+    await state_store.update_job("job-1", status="processing", progress=0.1)
+    await state_store.update_job("job-1", progress=0.5)
+
+    job = await state_store.get_job("job-1")
+    assert job["status"] == "processing"
+    assert job["progress"] == 0.5
+
+@pytest.mark.asyncio
+async def test_unknown_job_returns_none():
+    """Test that a missing job is reported as None"""
+    assert await state_store.get_job("missing") is None
+
+@pytest.mark.asyncio
+async def test_conversation_round_trip():
+    """Test saving, listing and deleting a conversation"""
+    await state_store.save_conversation("conv-1", {"query": "Paris in May"})
+
+    assert await state_store.list_conversations() == ["conv-1"]
+    state = await state_store.get_conversation("conv-1")
+    assert state["query"] == "Paris in May"
+
+    await state_store.delete_conversation("conv-1")
+    assert await state_store.get_conversation("conv-1") is None
+
+def test_serialized_state_restores_metadata():
+    """Test that metadata survives the JSON encoding used for Redis"""
+    metadata = TripMetadata(source="Boston", destination="New York", num_people=2)
+    raw = state_store.dumps({"metadata": metadata, "visited_places": {"a"}})
+
+    state = state_store._restore_state(state_store.loads(raw))
+    assert isinstance(state["metadata"], TripMetadata)
+    assert state["metadata"].destination == "New York"
+    assert state["visited_places"] == ["a"]
+
+def test_response_cache_key_ignores_case_and_spacing():
+    """Test that trivially different queries share a cache entry"""
+    key = state_store.response_cache_key("Plan a trip to Paris  for 2 people")
+    assert key == state_store.response_cache_key("  plan a trip to paris for 2 people ")
+    assert key.startswith("travelresp:")
+    assert len(key) == len("travelresp:") + 32
+
+@pytest.mark.asyncio
+async def test_cached_plan_is_isolated_from_later_edits():
+    """Test that a cached plan is not changed by edits to the served copy"""
+    await state_store.cache_plan("Paris", {"query": "Paris", "places": [{"name": "Louvre"}], "error": None, "session_id": "s-1"})
+
+    served = await state_store.get_cached_plan("paris")
+    served["places"].append({"name": "Orsay"})
+
+    cached = await state_store.get_cached_plan("paris")
+    assert cached["places"] == [{"name": "Louvre"}]
+    assert "error" not in cached
+    assert "session_id" not in cached
+
+@pytest.mark.asyncio
+async def test_memory_backend_expires_keys(monkeypatch):
+    """Test that in-memory entries disappear once their TTL has passed"""
+    now = [1000.0]
+    monkeypatch.setattr(state_store.time, "monotonic", lambda: now[0])
+    backend = InMemoryBackend()
+
+    await backend.set("conv:a", {"query": "Rome"}, ttl=10)
+    await backend.hset("job:a", {"status": "completed"}, ttl=10)
+    now[0] += 11
+
+    assert await backend.get("conv:a") is None
+    assert await backend.hgetall("job:a") == {}
+    assert await backend.scan("conv:") == []
+
+@pytest.mark.asyncio
+async def test_memory_backend_evicts_least_recently_used():
+    """Test that the in-memory backend stays within its size bound"""
+    backend = InMemoryBackend(max_entries=2)
+
+    await backend.set("conv:a", 1)
+    await backend.set("conv:b", 2)
+    await backend.get("conv:a")
+    await backend.set("conv:c", 3)
+
+    assert sorted(await backend.scan("conv:")) == ["conv:a", "conv:c"]
+
+@pytest.mark.asyncio
+async def test_lookup_cache_returns_hits_and_misses_in_order():
+    """Test that cached lookups come back aligned with the requested texts"""
+    await state_store.cache_lookups("geocode", {"Paris": [48.85, 2.35]})
+
+    results = await state_store.get_cached_lookups("geocode", ["Tokyo", " paris "])
+    assert results == [None, [48.85, 2.35]]
+    assert state_store.lookup_cache_key("geocode", "Paris").startswith("lookup:geocode:")
+
+@pytest.mark.asyncio
+async def test_agent_cache_reuses_results_for_same_metadata():
+    """Test that a wrapped agent only runs once for matching trip details"""
+    from app.graph.cache import AgentCache
+
+    calls = []
+
+    async def branch(state):
+        calls.append(state["metadata"].destination)
+        return {"places": [{"name": "Louvre"}]}
+
+    cache = AgentCache()
+    cached = cache.wrap("attractions_agent", branch, ("destination",))
+
+    first = await cached({"metadata": TripMetadata(destination="Paris")})
+    second = await cached({"metadata": TripMetadata(destination=" paris")})
+
+    assert first == second == {"places": [{"name": "Louvre"}]}
+    assert calls == ["Paris"]
+    assert cache.stats == {"hits": 1, "misses": 1, "reused": 0}
+
+@pytest.mark.asyncio
+async def test_agent_cache_skips_agent_when_state_has_current_result():
+    """Test that a result already in the state is kept while its inputs are unchanged"""
+    from app.graph.cache import AgentCache
+
+    async def branch(state):
+        return {"places": [{"name": "Louvre"}]}
+
+    cache = AgentCache()
+    cached = cache.wrap("attractions_agent", branch, ("destination",), "places")
+
+    state = {"metadata": TripMetadata(destination="Paris")}
+    state.update(await cached(state))
+    assert state["agent_inputs"]["attractions_agent"]
+
+    assert await cached(state) == {}
+    assert cache.stats["reused"] == 1
+
+    state["metadata"] = TripMetadata(destination="Rome")
+    assert "places" in await cached(state)
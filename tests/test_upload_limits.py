@@ -0,0 +1,40 @@
+import importlib.util
+from pathlib import Path
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app as main_app
+from app.utils import uploads
+
+# app/api.py shares its import name with the app/api/ package, so load it by path
+_spec = importlib.util.spec_from_file_location(
+    "travel_api", Path(__file__).resolve().parent.parent / "app" / "api.py"
+)
+api = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(api)
+
+@pytest.fixture(autouse=True)
+def small_upload_limit(monkeypatch, tmp_path):
+    """Cap uploads at 1 KiB, with temp files under tmp_path"""
+    monkeypatch.setattr(uploads, "MAX_AUDIO_BYTES", 1024)
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_SIZE", 256)
+    monkeypatch.setattr(uploads, "UPLOAD_TEMP_DIR", str(tmp_path))
+
+def test_main_voice_input_rejects_oversized_upload(tmp_path):
+    """Test that app.main answers an oversized upload with 413 and keeps no temp file"""
+    response = TestClient(main_app).post(
+        "/voice-input",
+        files={"file": ("clip.mp3", b"x" * 2000, "audio/mpeg")}
+    )
+
+    assert response.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+def test_api_voice_rejects_oversized_upload(tmp_path):
+    """Test that app/api.py answers an oversized upload with 413 and keeps no temp file"""
+    response = TestClient(api.app).post(
+        "/travel/voice",
+        files={"file": ("clip.mp3", b"x" * 2000, "audio/mpeg")}
+    )
+
+    assert response.status_code == 413
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,51 @@
+import io
+import pytest
+from fastapi import HTTPException, UploadFile
+from app.utils import uploads
+
+@pytest.fixture(autouse=True)
+def small_upload_limit(monkeypatch, tmp_path):
+    """Cap uploads at 1 KiB, read in 256-byte chunks, with temp files under tmp_path"""
+    monkeypatch.setattr(uploads, "MAX_AUDIO_BYTES", 1024)
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_SIZE", 256)
+    monkeypatch.setattr(uploads, "UPLOAD_TEMP_DIR", str(tmp_path))
+
+@pytest.mark.asyncio
+async def test_save_upload_within_limit():
+    """Test that an upload under the limit is copied in full"""
+    dest = io.BytesIO()
+
+    written = await uploads.save_upload(UploadFile(io.BytesIO(b"x" * 1000)), dest)
+
+    assert written == 1000
+    assert dest.getvalue() == b"x" * 1000
+
+@pytest.mark.asyncio
+async def test_save_upload_over_limit():
+    """Test that an upload over the limit stops with a 413"""
+    dest = io.BytesIO()
+
+    with pytest.raises(HTTPException) as exc_info:
+        await uploads.save_upload(UploadFile(io.BytesIO(b"x" * 2000)), dest)
+
+    assert exc_info.value.status_code == 413
+    assert len(dest.getvalue()) <= 1024
+
+@pytest.mark.asyncio
+async def test_save_upload_to_temp(tmp_path):
+    """Test that an upload is saved to a temp file with the given suffix"""
+    path = await uploads.save_upload_to_temp(UploadFile(io.BytesIO(b"x" * 1000)), ".mp3")
+
+    assert path.startswith(str(tmp_path))
+    assert path.endswith(".mp3")
+    with open(path, "rb") as saved:
+        assert saved.read() == b"x" * 1000
+
+@pytest.mark.asyncio
+async def test_oversized_upload_leaves_no_temp_file(tmp_path):
+    """Test that an upload over the limit raises 413 and removes its temp file"""
+    with pytest.raises(HTTPException) as exc_info:
+        await uploads.save_upload_to_temp(UploadFile(io.BytesIO(b"x" * 2000)), ".mp3")
+
+    assert exc_info.value.status_code == 413
+    assert list(tmp_path.iterdir()) == []
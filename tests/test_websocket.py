@@ -0,0 +1,136 @@
+import asyncio
+import importlib.util
+import orjson
+from pathlib import Path
+import pytest
+from fastapi.testclient import TestClient
+from app import state_store
+from app.state_store import InMemoryBackend
+from app.connection_manager import ConnectionManager
+
+# app/api.py shares its import name with the app/api/ package, so load it by path
+_spec = importlib.util.spec_from_file_location(
+    "travel_api", Path(__file__).resolve().parent.parent / "app" / "api.py"
+)
+api = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(api)
+
+client = TestClient(api.app)
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    """Run every test against a fresh in-memory backend and connection registry"""
+    monkeypatch.setattr(state_store, "backend", InMemoryBackend())
+    monkeypatch.setattr(api, "connection_manager", ConnectionManager())
+
+def test_ping_reply():
+    """Test that the literal ping frame is answered with a pong"""
+    with client.websocket_connect("/ws/conv-1") as websocket:
+        websocket.send_text(api.PING_MESSAGE)
+        reply = websocket.receive_json()
+
+    assert reply["type"] == "pong"
+    assert reply["next_poll_in_ms"] == api.MIN_POLL_INTERVAL_MS
+
+def test_reformatted_ping_reply():
+    """Test that a ping not matching the literal frame is still answered"""
+    with client.websocket_connect("/ws/conv-1") as websocket:
+        websocket.send_text('{ "type": "ping" }')
+        assert websocket.receive_json()["type"] == "pong"
+
+def test_initial_state_sent_without_version():
+    """Test that a new client is sent the current state on connect"""
+    asyncio.run(api.save_conversation_state("conv-1", {"query": "Paris in May"}))
+
+    with client.websocket_connect("/ws/conv-1") as websocket:
+        message = websocket.receive_json()
+
+    assert message["type"] == "state_update"
+    assert message["data"]["version"] == 1
+
+def test_initial_state_skipped_for_current_version():
+    """Test that a client reconnecting with the current version is not resent the state"""
+    asyncio.run(api.save_conversation_state("conv-1", {"query": "Paris in May"}))
+
+    with client.websocket_connect("/ws/conv-1?version=1") as websocket:
+        websocket.send_text(api.PING_MESSAGE)
+        # The first frame is the pong, so no state_update came before it
+        assert websocket.receive_json()["type"] == "pong"
+
+def test_initial_state_sent_for_stale_version():
+    """Test that a client reconnecting with an old version is sent the state"""
+    state = {"query": "Paris in May"}
+    asyncio.run(api.save_conversation_state("conv-1", state))
+    asyncio.run(api.save_conversation_state("conv-1", state))
+
+    with client.websocket_connect("/ws/conv-1?version=1") as websocket:
+        message = websocket.receive_json()
+
+    assert message["type"] == "state_update"
+    assert message["data"]["version"] == 2
+
+class RecordingSocket:
+    """Stands in for a connected WebSocket, keeping every frame sent to it"""
+    def __init__(self):
+        self.frames = []
+
+    async def send_text(self, text):
+        self.frames.append(orjson.loads(text))
+
+async def broadcast_and_flush(updates):
+    socket = RecordingSocket()
+    await api.connection_manager.register("conv-1", socket)
+    for update_type, data in updates:
+        await api.broadcast_update("conv-1", update_type, data)
+    await asyncio.gather(*api.broadcast_tasks)
+    return socket.frames
+
+@pytest.mark.asyncio
+async def test_single_update_sent_unwrapped():
+    """Test that a lone update goes out as a plain message"""
+    frames = await broadcast_and_flush([("processing_step", {"step": "planner"})])
+
+    assert frames == [{
+        "type": "processing_step",
+        "data": {"step": "planner", "conversation_id": "conv-1"}
+    }]
+
+@pytest.mark.asyncio
+async def test_close_updates_sent_as_one_batch():
+    """Test that updates raised together go out as one batch frame, in order"""
+    frames = await broadcast_and_flush([
+        ("processing_step", {"step": "planner"}),
+        ("processing_step", {"step": "flights"}),
+        ("job_complete", {"job_id": "job-1"})
+    ])
+
+    assert len(frames) == 1
+    assert frames[0]["type"] == "batch"
+    assert [(event["type"], event["data"].get("step")) for event in frames[0]["events"]] == [
+        ("processing_step", "planner"),
+        ("processing_step", "flights"),
+        ("job_complete", None)
+    ]
+    assert all(event["data"]["conversation_id"] == "conv-1" for event in frames[0]["events"])
+
+@pytest.mark.asyncio
+async def test_updates_without_subscribers_are_dropped():
+    """Test that nothing is queued for a conversation nobody is connected to"""
+    await api.broadcast_update("conv-2", "processing_step", {"step": "planner"})
+
+    assert "conv-2" not in api.pending_broadcasts
+
+@pytest.mark.asyncio
+async def test_updates_after_a_flush_start_a_new_frame():
+    """Test that an update raised after the batch window is sent on its own"""
+    socket = RecordingSocket()
+    await api.connection_manager.register("conv-1", socket)
+
+    await api.broadcast_update("conv-1", "processing_step", {"step": "planner"})
+    await asyncio.gather(*api.broadcast_tasks)
+    await api.broadcast_update("conv-1", "processing_step", {"step": "flights"})
+    await asyncio.gather(*api.broadcast_tasks)
+
+    assert [frame["type"] for frame in socket.frames] == ["processing_step", "processing_step"]
+    assert [frame["data"]["step"] for frame in socket.frames] == ["planner", "flights"]
+    assert not api.pending_broadcasts